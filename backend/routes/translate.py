@@ -1,14 +1,23 @@
 # backend/routes/translate.py
+import asyncio
 import json
+import re
+import time
 from enum import Enum
+from typing import AsyncIterator, List, Optional, Tuple
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 
-from backend.utils.settings import get_async_openai
-from backend.utils.constants import MODEL, HEB_RANGE
-from backend.utils.responses import stream_llm
+from backend.utils.admission import hold_while_streaming, stages
+from backend.utils.constants import (
+    HEB_RANGE, TRANSLATE_CONCURRENCY, TRANSLATE_RETRIES, TRANSLATE_SEGMENT_CHARS,
+)
+from backend.utils.llm_client import complete
+from backend.utils.logger import log
+from backend.utils.responses import StreamTally, stream_llm, until_disconnect
 
 router = APIRouter(prefix="/api/translate", tags=["translate"])
 
@@ -43,27 +52,103 @@ def _build_prompt(text: str, target_lang: str) -> str:
     )
 
 
+# ---------- SEGMENTING ----------
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?\u05C3])\s+")
+
+# Output budget per segment: a full TRANSLATE_SEGMENT_CHARS segment must
+# never be cut off (Hebrew → English runs ~3–4 characters per token)
+_SEGMENT_MAX_TOKENS = 1000
+
+
+def split_segments(text: str, max_chars: int = TRANSLATE_SEGMENT_CHARS) -> List[Tuple[str, str]]:
+    """Split ``text`` into translation segments of at most ``max_chars``.
+
+    Whole paragraphs are packed together where they fit; a paragraph that is
+    too long on its own is split at sentence ends (and, failing that, hard
+    at ``max_chars``). Returns ``(segment, separator)`` pairs, where the
+    separator is what joined the segment to the next one in the source, so
+    ``"".join(seg + sep ...)`` restores the layout.
+    """
+    units: List[Tuple[str, str]] = []  # (piece, separator before the next piece)
+    for para in _PARAGRAPH_BREAK.split(text.strip()):
+        para = para.strip()
+        if not para:
+            continue
+        if len(para) <= max_chars:
+            units.append((para, "\n\n"))
+            continue
+        for sent in _SENTENCE_END.split(para):
+            # A hard split cuts mid-word: only the sentence's last piece is followed by a space
+            for i in range(0, len(sent), max_chars):
+                units.append((sent[i:i + max_chars], "" if i + max_chars < len(sent) else " "))
+        units[-1] = (units[-1][0], "\n\n")
+
+    segments: List[Tuple[str, str]] = []
+    buf, buf_sep = "", ""
+    for piece, sep in units:
+        if buf and len(buf) + len(buf_sep) + len(piece) > max_chars:
+            segments.append((buf, buf_sep))
+            buf = ""
+        buf = f"{buf}{buf_sep}{piece}" if buf else piece
+        buf_sep = sep
+    if buf:
+        segments.append((buf, ""))
+    return segments
+
+
+async def _translate_segment(text: str, target_lang: str, sem: asyncio.Semaphore) -> str:
+    """Translate one segment, retrying it on its own if the call fails."""
+    prompt = _build_prompt(text, target_lang)
+    for attempt in range(TRANSLATE_RETRIES + 1):
+        try:
+            async with sem:
+                out = await complete(
+                    TRANSLATE_SYSTEM_PROMPT, prompt, max_tokens=_SEGMENT_MAX_TOKENS, temperature=0.0,
+                    kind="translate",
+                )
+            return out.strip()
+        except Exception as exc:
+            if attempt == TRANSLATE_RETRIES:
+                raise
+            log.warning("TRANSLATE | segment_retry | attempt=%d | chars=%d | err=%s", attempt + 1, len(text), exc)
+            await asyncio.sleep(0.5 * 2 ** attempt)
+    raise AssertionError("unreachable")
+
+
+def _start_segments(segments: List[Tuple[str, str]], target_lang: str) -> List["asyncio.Task[str]"]:
+    # Tasks are created in document order and the semaphore is FIFO, so
+    # earlier segments start (and usually finish) first
+    sem = asyncio.Semaphore(TRANSLATE_CONCURRENCY)
+    return [asyncio.create_task(_translate_segment(seg, target_lang, sem)) for seg, _ in segments]
+
+
 # ---------- INTERNAL HELPER (non-streaming) ----------
 
 async def translate_text(text: str, target_lang: str) -> str:
     """
     Internal helper – non-streaming translation.
     target_lang: 'he' or 'en'
+
+    Long texts are split on paragraph boundaries and the segments are
+    translated concurrently, so nothing is truncated and the wall-clock
+    time is roughly that of the slowest segment.
     """
     if not text or not text.strip():
         return text
 
-    prompt = _build_prompt(text, target_lang)
-
-    resp = await get_async_openai().responses.create(
-        model=MODEL,
-        input=[
-            {"role": "system", "content": TRANSLATE_SYSTEM_PROMPT},
-            {"role": "user", "content": prompt},
-        ],
-        max_output_tokens=600,
-    )
-    return resp.output_text.strip()
+    segments = split_segments(text)
+    t0 = time.perf_counter()
+    tasks = _start_segments(segments, target_lang)
+    try:
+        outs = await asyncio.gather(*tasks)
+    finally:
+        for t in tasks:
+            t.cancel()  # one segment failed for good — stop the rest
+    if len(segments) > 1:
+        log.info("TRANSLATE | segments=%d | chars=%d | elapsed=%.2fs", len(segments), len(text), time.perf_counter() - t0)
+    return "".join(out + sep for out, (_, sep) in zip(outs, segments)).strip()
 
 
 # ---------- ROUTES ----------
@@ -78,7 +163,7 @@ async def translate_route(req: TranslateReq) -> str:
 
 
 @router.post("/stream")
-async def translate_stream_route(req: TranslateReq):
+async def translate_stream_route(request: Request, req: TranslateReq):
     """
     Streaming HTTP endpoint (SSE) for translation.
     Same SSE JSON format as /ask/stream:
@@ -91,18 +176,54 @@ async def translate_stream_route(req: TranslateReq):
         # Fast no-op: just emit empty sources
         return StreamingResponse(_empty(), media_type="text/event-stream")
 
-    user_prompt = _build_prompt(text, req.target_lang.value)
+    segments = split_segments(text)
 
-    return StreamingResponse(
-        stream_llm(
-            user_prompt=user_prompt,
+    # Shares the LLM streaming stage limit with /api/ask/stream (503 when full)
+    release = await stages["llm"].acquire()
+
+    async def _release() -> None:
+        release()  # idempotent; covers streams that never start iterating
+
+    tally = StreamTally()
+    if len(segments) > 1:
+        # Long text: whole translated segments, in order, as each is ready
+        body = _stream_segments(segments, req.target_lang.value, tally)
+    else:
+        body = stream_llm(
+            user_prompt=_build_prompt(text, req.target_lang.value),
             ctx_sources=[],  # no RAG sources for translation
             system_prompt=TRANSLATE_SYSTEM_PROMPT,
             temperature=0.0,
-        ),
+            tally=tally,
+        )
+
+    return StreamingResponse(
+        until_disconnect(request, hold_while_streaming(body, release), route="translate", tally=tally),
         media_type="application/x-ndjson",
+        background=BackgroundTask(_release),
     )
 
 
+async def _stream_segments(
+    segments: List[Tuple[str, str]], target_lang: str, tally: Optional[StreamTally] = None,
+) -> AsyncIterator[str]:
+    """Translate all segments concurrently; emit each as a chunk in document order."""
+    tasks = _start_segments(segments, target_lang)
+    if tally is not None:
+        def _done(t: "asyncio.Task[str]") -> None:
+            if not t.cancelled() and t.exception() is None:
+                tally.generated += 1
+        for t in tasks:
+            t.add_done_callback(_done)
+    try:
+        for task, (_, sep) in zip(tasks, segments):
+            out = await task
+            yield json.dumps({"type": "chunk", "data": out + sep}, ensure_ascii=False) + "\n"
+    finally:
+        for t in tasks:
+            t.cancel()  # client went away or a segment failed for good
+    yield json.dumps({"type": "sources", "data": []}, ensure_ascii=False) + "\n"
+
+
 async def _empty():
     yield f"data: {json.dumps({'type':'sources','data': []}, ensure_ascii=False)}\n\n"
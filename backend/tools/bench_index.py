@@ -0,0 +1,119 @@
+"""Benchmark the quantized IVF/int8 index against exact float search.
+
+Reports recall@k (overlap with the exact top-k), per-query latency and
+memory for exact brute-force search and for the index at several nprobe
+settings.
+
+Usage:
+    python -m backend.tools.bench_index --synthetic 1000000
+    python -m backend.tools.bench_index --from-chroma --queries 200
+
+Synthetic data is a mixture of Gaussian clusters projected onto the unit
+sphere, with queries drawn as noisy copies of stored vectors — roughly how
+paraphrased user questions sit around generated ones.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+
+from backend.utils.constants import IVF_RERANK
+from backend.utils.vector_index import QuantizedIndex, build_index
+
+
+def _unit(x: np.ndarray) -> np.ndarray:
+    return (x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)).astype(np.float32)
+
+
+def synthetic(n: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = _unit(rng.standard_normal((clusters, dim)))
+    out = np.empty((n, dim), dtype=np.float32)
+    for s in range(0, n, 100_000):
+        m = min(100_000, n - s)
+        pick = rng.integers(clusters, size=m)
+        out[s:s + m] = _unit(centers[pick] + 1.4 / np.sqrt(dim) * rng.standard_normal((m, dim)))
+    return out
+
+
+def _pct(xs: list[float], p: float) -> float:
+    return float(np.percentile(np.asarray(xs) * 1000, p))
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--synthetic", type=int, metavar="N", help="generate N random unit vectors")
+    src.add_argument("--from-chroma", action="store_true", help="use the question embeddings in Chroma")
+    ap.add_argument("--tenant", help="tenant whose questions --from-chroma uses (default: the default tenant)")
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--clusters", type=int, default=2000)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=50)
+    ap.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    ap.add_argument("--rerank", type=int, default=IVF_RERANK)
+    args = ap.parse_args()
+
+    if args.from_chroma:
+        from backend.utils.tenants import tenants
+        from backend.utils.vector_index import export_question_vectors
+        ids, vecs = export_question_vectors(tenants.get(args.tenant).coll)
+    else:
+        vecs = synthetic(args.synthetic, args.dim, args.clusters)
+        ids = [f"q{i}" for i in range(len(vecs))]
+    n = len(vecs)
+    if n == 0:
+        raise SystemExit("no vectors")
+
+    rng = np.random.default_rng(1)
+    base = vecs[rng.integers(n, size=args.queries)]
+    queries = _unit(base + 0.5 * rng.standard_normal(base.shape).astype(np.float32) / np.sqrt(base.shape[1]))
+    k = min(args.k, n)
+
+    # Exact search: brute-force float matmul over everything held in RAM
+    exact_top, exact_t = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        sims = vecs @ q
+        top = np.argpartition(-sims, k - 1)[:k]
+        exact_t.append(time.perf_counter() - t0)
+        exact_top.append({ids[i] for i in top})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index")
+        t0 = time.perf_counter()
+        build_index(path, ids, vecs)
+        build_s = time.perf_counter() - t0
+        idx = QuantizedIndex(path)
+
+        print(f"vectors={n} dim={vecs.shape[1]} lists={len(idx.centroids)} k={k} "
+              f"rerank={args.rerank} build={build_s:.1f}s")
+        print(f"{'engine':<16}{'recall@k':>10}{'p50 ms':>10}{'p95 ms':>10}{'resident MB':>14}{'mapped MB':>12}")
+        print(f"{'exact':<16}{1.0:>10.3f}{_pct(exact_t, 50):>10.2f}{_pct(exact_t, 95):>10.2f}"
+              f"{vecs.nbytes / 2**20:>14.1f}{0.0:>12.1f}")
+
+        mapped = (idx.codes.nbytes + idx.vectors.nbytes) / 2**20
+        for nprobe in args.nprobe:
+            recalls, times = [], []
+            for q, truth in zip(queries, exact_top):
+                t0 = time.perf_counter()
+                hits = idx.search(q, k, nprobe=nprobe, rerank=args.rerank)
+                times.append(time.perf_counter() - t0)
+                recalls.append(len({idx.ids[r] for r, _ in hits} & truth) / k)
+            print(f"{'ivf nprobe=' + str(nprobe):<16}{np.mean(recalls):>10.3f}{_pct(times, 50):>10.2f}"
+                  f"{_pct(times, 95):>10.2f}{idx.resident_bytes() / 2**20:>14.1f}{mapped:>12.1f}")
+    print(f"peak process RSS: {_rss_mb():.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Build the quantized question index from the Chroma collection.
+
+Usage:
+    python -m backend.tools.build_index [--tenant ID] [--out DIR] [--nlist N]
+
+The running API picks the new index up on restart (with RETRIEVAL_ENGINE=ivf)
+or immediately via POST /api/admin/index/rebuild.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from backend.utils.tenants import tenants
+from backend.utils.vector_index import build_index, export_question_vectors, load_index
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tenant", help=f"tenant id (default: {tenants.default})")
+    ap.add_argument("--out", help="index directory (default: the tenant's index directory)")
+    ap.add_argument("--nlist", type=int, default=None, help="IVF lists (default: 4·sqrt(n), max 4096)")
+    args = ap.parse_args()
+    tenant = tenants.get(args.tenant)
+    out = args.out or tenant.index_dir
+
+    t0 = time.perf_counter()
+    exported_at = time.time()
+    ids, vecs = export_question_vectors(tenant.coll)
+    if not ids:
+        raise SystemExit("no question entries in the collection")
+    t1 = time.perf_counter()
+    build_index(out, ids, vecs, nlist=args.nlist, exported_at=exported_at)
+    idx = load_index(out)
+    print(f"exported {len(ids)} questions in {t1 - t0:.2f}s, built in {time.perf_counter() - t1:.2f}s")
+    if idx is not None:
+        print(idx.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Export or restore a knowledge-base snapshot without going through the API.
+
+Usage:
+    python -m backend.tools.snapshot export data/snapshots/kb.npz
+    python -m backend.tools.snapshot import data/snapshots/kb.npz [--merge] [--build-index]
+    python -m backend.tools.snapshot info data/snapshots/kb.npz
+
+``--tenant ID`` selects the tenant's collection (default: the default tenant).
+
+Import loads stored embeddings directly — no embedding model, translation or
+LLM calls — so restoring a full portfolio takes seconds. ``--build-index``
+also writes the quantized question index: from the snapshot's vectors, or
+from the whole collection after ``--merge``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+
+from backend.utils.snapshot import export_snapshot, import_snapshot, question_vectors, read_snapshot
+from backend.utils.tenants import tenants
+from backend.utils.vector_index import build_index, rebuild_from_collection
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("action", choices=["export", "import", "info"])
+    ap.add_argument("path")
+    ap.add_argument("--merge", action="store_true", help="upsert over existing entries instead of replacing them")
+    ap.add_argument("--build-index", action="store_true", help="also rebuild the tenant's quantized index")
+    ap.add_argument("--tenant", help=f"tenant id (default: {tenants.default})")
+    args = ap.parse_args()
+    tenant = tenants.get(args.tenant)
+
+    t0 = time.perf_counter()
+    if args.action == "export":
+        os.makedirs(os.path.dirname(os.path.abspath(args.path)), exist_ok=True)
+        header = export_snapshot(tenant.coll, args.path)
+        print(json.dumps(header, indent=2))
+    else:
+        snap = read_snapshot(args.path)
+        if args.action == "info":
+            print(json.dumps(snap.header, indent=2))
+            return
+        started = time.time()
+        print(json.dumps(import_snapshot(tenant.coll, snap, replace=not args.merge), indent=2))
+        if args.build_index:
+            if args.merge:
+                rebuild_from_collection(tenant.coll, tenant.index_dir)  # snapshot + what was already there
+            else:
+                q_ids, q_vecs = question_vectors(snap)
+                if q_ids:
+                    build_index(tenant.index_dir, q_ids, q_vecs, exported_at=started)
+    print(f"done in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Minimal local stand-in for the OpenAI API, for latency experiments.
+
+Serves just enough of ``/v1/responses`` and ``/v1/chat/completions`` (streaming
+and non-streaming) for ``backend.utils.llm_client`` to work against it, with a
+configurable time-to-first-token so hedging and fallbacks can be exercised
+without spending tokens.
+
+Usage:
+    STUB_TTFT=0.2 STUB_SLOW_TTFT=8 STUB_SLOW_RATE=0.1 \\
+        uvicorn backend.tools.stub_openai:app --port 9100
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1 OPENAI_API_KEY=stub LLM_HEDGING=1 \\
+        uvicorn backend.api.main:app --port 8000
+
+Env:
+    STUB_TTFT       seconds before the first delta (default 0.2)
+    STUB_SLOW_TTFT  seconds before the first delta on a "slow edge" request
+    STUB_SLOW_RATE  fraction of requests that take the slow path (default 0)
+    STUB_FAIL_PATH  "responses" or "chat" — that path always returns HTTP 500
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+TTFT = float(os.getenv("STUB_TTFT", "0.2"))
+SLOW_TTFT = float(os.getenv("STUB_SLOW_TTFT", "8"))
+SLOW_RATE = float(os.getenv("STUB_SLOW_RATE", "0"))
+FAIL_PATH = os.getenv("STUB_FAIL_PATH", "")
+
+REPLY = "This is a stubbed answer streamed from the local test server."
+
+app = FastAPI(title="OpenAI stub")
+stats = {"responses": 0, "chat": 0, "cancelled": 0}
+
+
+def _ttft() -> float:
+    return SLOW_TTFT if random.random() < SLOW_RATE else TTFT
+
+
+def _words() -> list[str]:
+    return [w + " " for w in REPLY.split()]
+
+
+def _sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def _responses_events(delay: float):
+    resp_id = f"resp_{uuid.uuid4().hex}"
+    item_id = f"msg_{uuid.uuid4().hex}"
+    try:
+        yield _sse({"type": "response.created", "sequence_number": 0,
+                    "response": {"id": resp_id, "object": "response", "status": "in_progress", "output": []}})
+        await asyncio.sleep(delay)
+        for seq, word in enumerate(_words(), start=1):
+            yield _sse({"type": "response.output_text.delta", "sequence_number": seq, "item_id": item_id,
+                        "output_index": 0, "content_index": 0, "delta": word, "logprobs": []})
+            await asyncio.sleep(0.02)
+        yield _sse({"type": "response.completed", "sequence_number": 999,
+                    "response": {"id": resp_id, "object": "response", "status": "completed", "output": []}})
+    except asyncio.CancelledError:
+        stats["cancelled"] += 1
+        raise
+
+
+async def _chat_chunks(delay: float):
+    cmpl_id = f"chatcmpl-{uuid.uuid4().hex}"
+    try:
+        await asyncio.sleep(delay)
+        for word in _words():
+            chunk = {"id": cmpl_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": "stub",
+                     "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(0.02)
+        yield "data: [DONE]\n\n"
+    except asyncio.CancelledError:
+        stats["cancelled"] += 1
+        raise
+
+
+@app.post("/v1/responses")
+async def responses(request: Request):
+    stats["responses"] += 1
+    if FAIL_PATH == "responses":
+        return JSONResponse({"error": {"message": "stubbed failure"}}, status_code=500)
+    body = await request.json()
+    delay = _ttft()
+    if body.get("stream"):
+        return StreamingResponse(_responses_events(delay), media_type="text/event-stream")
+    await asyncio.sleep(delay)
+    return {
+        "id": f"resp_{uuid.uuid4().hex}", "object": "response", "created_at": int(time.time()),
+        "model": "stub", "status": "completed",
+        "output": [{"type": "message", "id": f"msg_{uuid.uuid4().hex}", "role": "assistant", "status": "completed",
+                    "content": [{"type": "output_text", "text": REPLY, "annotations": []}]}],
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    stats["chat"] += 1
+    if FAIL_PATH == "chat":
+        return JSONResponse({"error": {"message": "stubbed failure"}}, status_code=500)
+    body = await request.json()
+    delay = _ttft()
+    if body.get("stream"):
+        return StreamingResponse(_chat_chunks(delay), media_type="text/event-stream")
+    await asyncio.sleep(delay)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion", "created": int(time.time()), "model": "stub",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": REPLY}}],
+    }
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
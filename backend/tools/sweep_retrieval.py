@@ -0,0 +1,219 @@
+"""Sweep the retrieval parameters against a labeled question set.
+
+Runs the retrieval half of ``/api/ask/stream`` (embed → blend with context →
+adaptive nearest-question pool → MIN_SIM / MAX_PER_DOC filter → parent
+documents → prompt) over a grid of the adaptive pool (QUESTION_POOL_START,
+QUESTION_POOL_GROWTH, QUESTION_POOL_ENOUGH_PARENTS, capped at
+QUESTION_POOL), MIN_SIM, MAX_PER_DOC and HISTORY_WEIGHT, against the live
+Chroma collection (or the IVF index with ``RETRIEVAL_ENGINE=ivf``). The
+pool is grown exactly as ``ask`` grows it (``_adaptive_query_many``), so
+MIN_SIM and MAX_PER_DOC also decide how many candidates are fetched.
+Reports per setting:
+
+* ``recall@k``  — share of expected parent documents among the top-k sources
+* ``hit``       — questions with at least one expected parent in the sources
+* ``srcs``      — mean number of sources that would go into the prompt
+* ``tok``       — mean / p95 estimated prompt tokens (≈ 4 characters per token)
+* ``cand``      — mean candidates fetched per question (over all pool rounds)
+* ``ms``        — p50 / p95 retrieval latency: the nearest-question queries
+  for that setting plus the parent fetches they trigger
+
+Labeled file: JSON lines with ``question``, ``expected`` (a parent id or a
+list of them) and an optional ``context`` — the previous question, blended in
+as the conversation context exactly like a follow-up turn::
+
+    {"question": "What did he do with Spark?", "expected": ["cv"]}
+    {"question": "tell me more", "context": "Kubernetes at Acme", "expected": "cv"}
+
+Usage:
+    python -m backend.tools.sweep_retrieval labels.jsonl
+    python -m backend.tools.sweep_retrieval labels.jsonl --start 5 10 20 \\
+        --growth 2 4 --enough-parents 2 4 --min-sim 0.3 0.35 0.4 --csv sweep.csv
+    python -m backend.tools.sweep_retrieval labels.jsonl --tenant dana
+
+The row for the current constants is marked with ``*``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import json
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from backend.utils.constants import (
+    HISTORY_WEIGHT,
+    MAX_PER_DOC,
+    MIN_SIM,
+    QUESTION_POOL,
+    QUESTION_POOL_ENOUGH_PARENTS,
+    QUESTION_POOL_GROWTH,
+    QUESTION_POOL_START,
+)
+
+CHARS_PER_TOKEN = 4
+
+
+def _load_labels(path: str) -> List[Dict[str, Any]]:
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            expected = row.get("expected")
+            if not row.get("question") or not expected:
+                raise SystemExit(f"{path}:{n}: need 'question' and 'expected'")
+            row["expected"] = {expected} if isinstance(expected, str) else set(expected)
+            rows.append(row)
+    if not rows:
+        raise SystemExit(f"{path}: no labeled questions")
+    return rows
+
+
+def _pct(xs: List[float], p: float) -> float:
+    return float(np.percentile(xs, p)) if xs else 0.0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("labels", help="JSONL file of labeled questions")
+    ap.add_argument("--start", type=int, nargs="+", default=sorted({5, QUESTION_POOL_START, 20}),
+                    help="QUESTION_POOL_START values")
+    ap.add_argument("--growth", type=int, nargs="+", default=[QUESTION_POOL_GROWTH],
+                    help="QUESTION_POOL_GROWTH values (at least 2)")
+    ap.add_argument("--enough-parents", type=int, nargs="+", default=sorted({2, QUESTION_POOL_ENOUGH_PARENTS}),
+                    help="QUESTION_POOL_ENOUGH_PARENTS values")
+    ap.add_argument("--pool", type=int, nargs="+", default=[QUESTION_POOL], help="QUESTION_POOL (cap) values")
+    ap.add_argument("--min-sim", type=float, nargs="+", default=[0.3, MIN_SIM, 0.4, 0.45])
+    ap.add_argument("--max-per-doc", type=int, nargs="+", default=[1, 2, MAX_PER_DOC])
+    ap.add_argument("--history-weight", type=float, nargs="+", default=[HISTORY_WEIGHT])
+    ap.add_argument("--k", type=int, nargs="+", default=[1, 3])
+    ap.add_argument("--repeat", type=int, default=3, help="timed runs per query (median is used)")
+    ap.add_argument("--csv", help="also write every row to this CSV file")
+    ap.add_argument("--tenant", help="tenant to evaluate (default: the default tenant)")
+    args = ap.parse_args()
+    if min(args.growth) < 2:
+        ap.error("--growth must be at least 2")
+
+    # Imported late: loading the API module opens Chroma and builds the app
+    from sentence_transformers import SentenceTransformer
+
+    from backend.api import main as api
+    from backend.utils.settings import RETRIEVAL_ENGINE
+    from backend.utils.tenants import tenants
+
+    labels = _load_labels(args.labels)
+    tenant = tenants.get(args.tenant)
+
+    model = SentenceTransformer("all-MiniLM-L6-v2")
+    qvecs = model.encode([r["question"] for r in labels], normalize_embeddings=True)
+    contexts = [r.get("context") for r in labels]
+    ctx_rows = [i for i, c in enumerate(contexts) if c]
+    ctx_vecs: Dict[int, List[float]] = {}
+    if ctx_rows:
+        embs = model.encode([contexts[i] for i in ctx_rows], normalize_embeddings=True)
+        ctx_vecs = {i: e.tolist() for i, e in zip(ctx_rows, embs)}
+    weights = args.history_weight if ctx_rows else [HISTORY_WEIGHT]
+
+    # Parent documents are the same for every setting: load each once and
+    # time it, so a setting's fetch cost is the sum over the parents it pulls
+    parents: Dict[str, tuple[str, dict]] = {}
+    fetch_s: Dict[str, float] = {}
+
+    def _parents_for(pids: set[str]) -> Dict[str, tuple[str, dict]]:
+        for pid in pids - fetch_s.keys():
+            t0 = time.perf_counter()
+            parents.update(api._load_parents(tenant, {pid}))
+            fetch_s[pid] = time.perf_counter() - t0
+        return parents
+
+    view = tenant.versions.current
+    counter = api._candidate_counters.setdefault("sweep", {"requests": 0, "queries": 0, "candidates": 0})
+    repeat = max(1, args.repeat)
+    default = (QUESTION_POOL_START, QUESTION_POOL_GROWTH, QUESTION_POOL_ENOUGH_PARENTS, QUESTION_POOL,
+               MIN_SIM, MAX_PER_DOC, HISTORY_WEIGHT)
+    grid = list(itertools.product(sorted(args.start), sorted(args.growth), sorted(args.enough_parents),
+                                  sorted(args.pool), sorted(args.min_sim), sorted(args.max_per_doc)))
+    results = []
+    for hw in weights:
+        blended = [api._blend_embedding(q.tolist(), ctx_vecs.get(i), hw) for i, q in enumerate(qvecs)]
+        for start, growth, enough, pool, min_sim, max_per_doc in grid:
+            recall = {k: [] for k in args.k}
+            hits, n_src, tokens, latency, cand = 0, [], [], [], []
+            for row, vec in zip(labels, blended):
+                # One adaptive query per question, as ask_stream issues it; median of --repeat runs
+                times = []
+                before = counter["candidates"]
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    res = api._adaptive_query_many(
+                        tenant, [vec], view, "sweep", start=start, growth=growth, pool=pool,
+                        enough_parents=enough, min_sim=min_sim, max_per_doc=max_per_doc,
+                    )
+                    times.append(time.perf_counter() - t0)
+                cand.append((counter["candidates"] - before) / repeat)
+
+                matched = api._match_questions(res, min_sim=min_sim, max_per_doc=max_per_doc)
+                pids = {m["meta"].get("parent_id", "") for m in matched} - {""}
+                pairs = api._pair_parents(matched, _parents_for(pids))
+                pairs.sort(key=lambda p: -p["sim"])
+                got = [p["pid"] for p in pairs]
+
+                expected = row["expected"]
+                for k in args.k:
+                    recall[k].append(len(expected & set(got[:k])) / len(expected))
+                hits += bool(expected & set(got))
+                n_src.append(len(pairs))
+                prompt = (api._prompt(row["question"], [p["text"] for p in pairs], tenant.first) if pairs
+                          else api._prompt_fallback(row["question"], tenant.first))
+                tokens.append((len(tenant.system_prompt) + len(prompt)) / CHARS_PER_TOKEN)
+                latency.append(1000 * (float(np.median(times)) + sum(fetch_s[p] for p in pids)))
+
+            results.append({
+                "history_weight": hw,
+                "start": start,
+                "growth": growth,
+                "enough_parents": enough,
+                "pool": pool,
+                "min_sim": min_sim,
+                "max_per_doc": max_per_doc,
+                **{f"recall@{k}": float(np.mean(v)) for k, v in recall.items()},
+                "hit": hits / len(labels),
+                "sources": float(np.mean(n_src)),
+                "candidates": float(np.mean(cand)),
+                "tokens_mean": float(np.mean(tokens)),
+                "tokens_p95": _pct(tokens, 95),
+                "ms_p50": _pct(latency, 50),
+                "ms_p95": _pct(latency, 95),
+                "default": (start, growth, enough, pool, min_sim, max_per_doc, hw) == default,
+            })
+
+    print(f"questions={len(labels)} with_context={len(ctx_rows)} engine={RETRIEVAL_ENGINE} "
+          f"tenant={tenant.id} collection={tenant.coll.count()} entries")
+    rk = [f"recall@{k}" for k in args.k]
+    print(f"  {'hw':>5}{'start':>7}{'grow':>6}{'enough':>8}{'pool':>6}{'min_sim':>9}{'max/doc':>9}"
+          + "".join(f"{c:>11}" for c in rk)
+          + f"{'hit':>7}{'srcs':>7}{'cand':>7}{'tok':>8}{'tok p95':>9}{'ms p50':>9}{'ms p95':>9}")
+    for r in results:
+        print(("* " if r["default"] else "  ")
+              + f"{r['history_weight']:>5.2f}{r['start']:>7}{r['growth']:>6}{r['enough_parents']:>8}{r['pool']:>6}"
+              + f"{r['min_sim']:>9.2f}{r['max_per_doc']:>9}"
+              + "".join(f"{r[c]:>11.3f}" for c in rk)
+              + f"{r['hit']:>7.3f}{r['sources']:>7.2f}{r['candidates']:>7.1f}"
+              + f"{r['tokens_mean']:>8.0f}{r['tokens_p95']:>9.0f}{r['ms_p50']:>9.2f}{r['ms_p95']:>9.2f}")
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"wrote {len(results)} rows to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Admission control for the expensive stages of a request.
+
+Each stage (embedding, retrieval, LLM streaming) has a concurrency limit, a
+short bounded wait queue and a maximum wait. A request that finds the queue
+full, or that waits longer than allowed, is rejected immediately with
+:class:`Overloaded`, which the API turns into ``503`` + ``Retry-After`` — so a
+traffic spike degrades into fast, explicit rejections instead of every
+request slowing down together.
+
+Background work (ingest embedding) passes ``background=True``: it shares
+the stage's slots but waits for one as long as it takes instead of being
+rejected, and does not take up the request wait queue. Speculative work
+uses ``try_acquire``: it runs only if a slot is free right now.
+
+Limits live in ``ADMISSION_LIMITS`` (backend/utils/constants.py).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from backend.utils.constants import ADMISSION_LIMITS
+from backend.utils.logger import log
+
+
+class Overloaded(Exception):
+    """A stage is at capacity; retry after ``retry_after`` seconds."""
+
+    def __init__(self, stage: str, retry_after: int) -> None:
+        super().__init__(f"{stage} stage overloaded")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+class StageLimiter:
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait: float) -> None:
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._sem = asyncio.Semaphore(limit)
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._waits: deque[float] = deque(maxlen=500)
+        self._holds: deque[float] = deque(maxlen=500)
+
+    @property
+    def saturated(self) -> bool:
+        return self.active >= self.limit
+
+    def _retry_after(self) -> int:
+        """Rough time until a slot frees up, from recent hold times."""
+        avg_hold = sum(self._holds) / len(self._holds) if self._holds else self.max_wait
+        return max(1, math.ceil(avg_hold))
+
+    def _reject(self) -> Overloaded:
+        self.rejected += 1
+        retry = self._retry_after()
+        log.warning("ADMISSION | reject | stage=%s | active=%d | queued=%d | retry_after=%ds",
+                    self.name, self.active, self.queued, retry)
+        return Overloaded(self.name, retry)
+
+    def _abandon(self, pending: "asyncio.Task[bool]") -> None:
+        """Give up a queued acquire without leaking the permit it may have won."""
+        pending.cancel()
+
+        def _release_if_acquired(t: "asyncio.Task[bool]") -> None:
+            if not t.cancelled() and t.exception() is None:
+                self._sem.release()  # the acquire completed in the same tick as the timeout
+
+        pending.add_done_callback(_release_if_acquired)
+
+    async def acquire(self, background: bool = False) -> Callable[[], None]:
+        """Wait for a slot; returns an idempotent ``release`` callback."""
+        t0 = time.perf_counter()
+        if not self._sem.locked():
+            await self._sem.acquire()  # free slot: returns without suspending
+        elif background:
+            await self._sem.acquire()
+        else:
+            if self.queued >= self.max_queue:
+                raise self._reject()
+            self.queued += 1
+            # Not wait_for: on 3.11 it can drop a permit acquired just as the
+            # timeout fires, so the acquire runs as its own task instead.
+            pending = asyncio.ensure_future(self._sem.acquire())
+            try:
+                done, _ = await asyncio.wait({pending}, timeout=self.max_wait)
+            except BaseException:
+                self._abandon(pending)  # the request itself was cancelled
+                raise
+            finally:
+                self.queued -= 1
+            if not done:
+                self._abandon(pending)
+                raise self._reject()
+        return self._admitted(t0)
+
+    async def try_acquire(self) -> Optional[Callable[[], None]]:
+        """A slot only if one is free right now (speculative work); None otherwise."""
+        if self._sem.locked():
+            return None
+        t0 = time.perf_counter()
+        await self._sem.acquire()  # free slot: returns without suspending
+        return self._admitted(t0)
+
+    def _admitted(self, t0: float) -> Callable[[], None]:
+        started = time.perf_counter()
+        self._waits.append(started - t0)
+        self.active += 1
+        self.admitted += 1
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if released:
+                return
+            released = True
+            self.active -= 1
+            self._holds.append(time.perf_counter() - started)
+            self._sem.release()
+
+        return release
+
+    @asynccontextmanager
+    async def slot(self, background: bool = False) -> AsyncIterator[None]:
+        release = await self.acquire(background)
+        try:
+            yield
+        finally:
+            release()
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_ms_avg": round(1000 * sum(waits) / len(waits), 1) if waits else 0.0,
+            "wait_ms_p95": round(1000 * waits[int(0.95 * (len(waits) - 1))], 1) if waits else 0.0,
+        }
+
+
+stages: Dict[str, StageLimiter] = {
+    name: StageLimiter(name, *cfg) for name, cfg in ADMISSION_LIMITS.items()
+}
+
+
+def admission_stats() -> Dict[str, Any]:
+    return {name: s.stats() for name, s in stages.items()}
+
+
+async def hold_while_streaming(gen: AsyncIterator[str], release: Callable[[], None]) -> AsyncIterator[str]:
+    """Re-yield ``gen`` and release the stage slot when it finishes or is closed."""
+    try:
+        async for item in gen:
+            yield item
+    finally:
+        release()
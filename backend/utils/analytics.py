@@ -27,6 +27,8 @@ CREATE TABLE IF NOT EXISTS events (
     sources_count INTEGER,
     latency_ms    REAL
 );
+ALTER TABLE events ADD COLUMN IF NOT EXISTS tokens_generated INTEGER;
+ALTER TABLE events ADD COLUMN IF NOT EXISTS tokens_delivered INTEGER;
 """
 
 
@@ -61,6 +63,8 @@ async def log_event(
     score: Optional[float] = None,
     sources_count: Optional[int] = None,
     latency_ms: Optional[float] = None,
+    tokens_generated: Optional[int] = None,
+    tokens_delivered: Optional[int] = None,
 ) -> None:
     """Insert a single analytics row. Silently skipped when pool is None."""
     if pool is None:
@@ -68,8 +72,9 @@ async def log_event(
     try:
         await pool.execute(
             """
-            INSERT INTO events (event_type, ip_hash, question, language, score, sources_count, latency_ms)
-            VALUES ($1, $2, $3, $4, $5, $6, $7)
+            INSERT INTO events (event_type, ip_hash, question, language, score, sources_count, latency_ms,
+                                tokens_generated, tokens_delivered)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
             """,
             event_type,
             _hash_ip(ip),
@@ -78,6 +83,8 @@ async def log_event(
             score,
             sources_count,
             latency_ms,
+            tokens_generated,
+            tokens_delivered,
         )
     except Exception as exc:
         log.error("ANALYTICS | log_event failed: %s", exc)
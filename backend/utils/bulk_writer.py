@@ -0,0 +1,117 @@
+"""Batched Chroma writes for ingest.
+
+Every ``coll.add`` is its own SQLite transaction in ``chroma.sqlite3`` plus
+an HNSW segment update, so a job that wrote each document's chunks and
+questions separately paid that twice per document. Documents finishing at
+about the same time (the job worker processes a job's documents
+concurrently) hand their chunk and question records to the tenant's
+:class:`BulkWriter` instead, which packs them into one ``add`` of up to
+``BULK_WRITE_RECORDS`` records once that many are pending or
+``BULK_WRITE_WAIT`` has passed.
+
+A document's records always go into the same ``add`` unless they alone
+exceed the batch size. If a batched ``add`` fails, each of its documents is
+written again on its own, so one bad record fails only its own document.
+The caller compensates for a failed document by deleting its unpublished
+version (``DocVersions.drop``), which also removes anything a split write
+had stored.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.utils.constants import BULK_WRITE_RECORDS, BULK_WRITE_WAIT
+from backend.utils.logger import log
+
+_FIELDS = ("ids", "documents", "embeddings", "metadatas")
+
+
+class BulkWriter:
+    """Coalesces concurrent per-document adds to one collection."""
+
+    def __init__(self, coll: Any, max_records: int = BULK_WRITE_RECORDS, wait: float = BULK_WRITE_WAIT) -> None:
+        self.coll = coll
+        self.max_records = max_records
+        self.wait = wait
+        self._pending: List[Tuple[str, Dict[str, list], asyncio.Future]] = []
+        self._pending_records = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+        self.counters = {"flushes": 0, "docs": 0, "records": 0, "fallback_docs": 0, "failed_docs": 0}
+        self._write_seconds = 0.0
+
+    async def add(
+        self, doc_id: str, ids: List[str], documents: List[str],
+        embeddings: List[List[float]], metadatas: List[Dict[str, Any]],
+    ) -> None:
+        """Store one document's records; returns once they are written."""
+        if not ids:
+            return
+        records = {"ids": ids, "documents": documents, "embeddings": embeddings, "metadatas": metadatas}
+        if self._pending and self._pending_records + len(ids) > self.max_records:
+            self._flush()
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((doc_id, records, fut))
+        self._pending_records += len(ids)
+        if self._pending_records >= self.max_records:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.wait, self._flush)
+        await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_records = self._pending, [], 0
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _write(self, records: Dict[str, list]) -> None:
+        # Only a single document larger than max_records takes more than one add
+        n = len(records["ids"])
+        t0 = time.perf_counter()
+        for s in range(0, n, self.max_records):
+            self.coll.add(**{k: records[k][s:s + self.max_records] for k in _FIELDS})
+            self.counters["flushes"] += 1
+        self._write_seconds += time.perf_counter() - t0
+        self.counters["records"] += n
+
+    async def _run(self, batch: List[Tuple[str, Dict[str, list], asyncio.Future]]) -> None:
+        merged: Dict[str, list] = {k: [] for k in _FIELDS}
+        for _, records, _ in batch:
+            for k in _FIELDS:
+                merged[k].extend(records[k])
+        t0 = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._write, merged)
+        except Exception as exc:
+            if len(batch) == 1:
+                self.counters["failed_docs"] += 1
+                if not batch[0][2].done():
+                    batch[0][2].set_exception(exc)
+                return
+            log.warning("BULK | batch_failed | docs=%d | records=%d | err=%s", len(batch), len(merged["ids"]), exc)
+            self.counters["fallback_docs"] += len(batch)
+            await asyncio.gather(*(self._run([entry]) for entry in batch))
+            return
+
+        self.counters["docs"] += len(batch)
+        for _, _, fut in batch:
+            if not fut.done():
+                fut.set_result(None)
+        elapsed = time.perf_counter() - t0
+        log.info("BULK | flush | docs=%d | records=%d | ms=%.0f | records_per_s=%.0f",
+                 len(batch), len(merged["ids"]), 1000 * elapsed, len(merged["ids"]) / max(elapsed, 1e-6))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending_records": self._pending_records,
+            **self.counters,
+            "records_per_s": round(self.counters["records"] / self._write_seconds, 1) if self._write_seconds else 0.0,
+        }
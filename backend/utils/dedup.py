@@ -0,0 +1,30 @@
+from typing import List, Optional
+
+import numpy as np
+
+
+def keep_distinct(embs: np.ndarray, threshold: float) -> List[int]:
+    """Greedy near-duplicate filter over unit-length embeddings.
+
+    Walks the rows in order and keeps one only if its cosine similarity to
+    every row kept so far is below ``threshold``; each kept row therefore
+    stands for a cluster of paraphrases. Returns the kept row indices.
+    """
+    kept: List[int] = []
+    for i in range(len(embs)):
+        if kept and float(np.max(embs[kept] @ embs[i])) >= threshold:
+            continue
+        kept.append(i)
+    return kept
+
+
+def nearest_above(
+    embs: np.ndarray, others: np.ndarray, threshold: float
+) -> List[Optional[int]]:
+    """For each row of ``embs``, the index of its most similar row in
+    ``others`` if that similarity is at least ``threshold``, else None."""
+    if len(embs) == 0 or len(others) == 0:
+        return [None] * len(embs)
+    sims = embs @ others.T
+    best = np.argmax(sims, axis=1)
+    return [int(j) if sims[i, j] >= threshold else None for i, j in enumerate(best)]
@@ -0,0 +1,261 @@
+"""Request hedging for upstream LLM calls.
+
+When the first delta of a stream has not arrived within a deadline derived
+from recent time-to-first-token (TTFT) history, a second identical request is
+fired. Whichever attempt yields first wins; the other one is cancelled and its
+upstream stream closed.
+
+Non-streaming calls are timed per call kind (question generation,
+translation segments, batch answers, ...), each with its own latency
+history, since one percentile over calls of very different sizes would
+hedge the slow kinds nearly every time and the fast ones too late.
+
+Hedges are paid for from a small token bucket that refills by a fixed fraction
+per request, so hedging can never add more than ``HEDGE_MAX_RATIO`` extra
+upstream calls on average.
+
+Disabled unless ``LLM_HEDGING=1``. Point ``OPENAI_BASE_URL`` at
+``backend/tools/stub_openai.py`` to exercise it locally.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+from backend.utils.constants import (
+    HEDGE_BURST,
+    HEDGE_DEFAULT_DEADLINE,
+    HEDGE_HISTORY,
+    HEDGE_MAX_DEADLINE,
+    HEDGE_MAX_RATIO,
+    HEDGE_MIN_DEADLINE,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_PERCENTILE,
+)
+from backend.utils.logger import log
+
+T = TypeVar("T")
+
+HEDGING_ENABLED = os.getenv("LLM_HEDGING", "0").strip().lower() in ("1", "true", "yes")
+
+
+class LatencyTracker:
+    """Rolling window of observed latencies with a percentile-based deadline."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        percentile: float = HEDGE_PERCENTILE,
+        history: int = HEDGE_HISTORY,
+        default: float = HEDGE_DEFAULT_DEADLINE,
+    ) -> None:
+        self.name = name
+        self.percentile = percentile
+        self.default = default
+        self._samples: deque[float] = deque(maxlen=history)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def deadline(self) -> float:
+        """Seconds to wait for the first result before hedging."""
+        if len(self._samples) < HEDGE_MIN_SAMPLES:
+            return self.default
+        ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, int(round(self.percentile / 100.0 * (len(ordered) - 1))))
+        return max(HEDGE_MIN_DEADLINE, min(HEDGE_MAX_DEADLINE, ordered[idx]))
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"samples": len(self._samples), "deadline_s": round(self.deadline(), 3)}
+
+
+class HedgeBudget:
+    """Token bucket: every request earns ``ratio`` tokens, a hedge costs one."""
+
+    def __init__(self, ratio: float = HEDGE_MAX_RATIO, burst: float = HEDGE_BURST) -> None:
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+        self.requests = 0
+        self.hedges = 0
+        self.denied = 0
+
+    def on_request(self) -> None:
+        self.requests += 1
+        self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            self.hedges += 1
+            return True
+        self.denied += 1
+        return False
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "denied": self.denied,
+            "tokens": round(self._tokens, 3),
+        }
+
+
+# Shared state — one tracker per call shape, one budget for all hedges
+ttft_tracker = LatencyTracker("stream_ttft")
+call_trackers: dict[str, LatencyTracker] = {}
+budget = HedgeBudget()
+hedge_wins = 0
+
+
+def call_tracker(kind: str) -> LatencyTracker:
+    """The latency history of one kind of non-streaming call."""
+    tracker = call_trackers.get(kind)
+    if tracker is None:
+        tracker = call_trackers[kind] = LatencyTracker(kind, default=HEDGE_DEFAULT_DEADLINE * 4)
+    return tracker
+
+
+def hedging_stats() -> dict[str, Any]:
+    return {
+        "enabled": HEDGING_ENABLED,
+        "stream": ttft_tracker.snapshot(),
+        "call": {kind: t.snapshot() for kind, t in call_trackers.items()},
+        "budget": budget.snapshot(),
+        "hedge_wins": hedge_wins,
+    }
+
+
+async def _cancel(task: asyncio.Task) -> None:
+    task.cancel()
+    with contextlib.suppress(BaseException):
+        await task
+
+
+async def _race(
+    start: Callable[[], Awaitable[T]],
+    tracker: LatencyTracker,
+    label: str,
+) -> tuple[T, int]:
+    """Run ``start()``; hedge with a second ``start()`` once the deadline passes.
+
+    Returns the first successful result and the index (0 = primary, 1 = hedge)
+    of the attempt that produced it. Raises the first error seen if every
+    attempt fails.
+    """
+    global hedge_wins
+    budget.on_request()
+    t0 = time.perf_counter()
+
+    primary = asyncio.ensure_future(start())
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=tracker.deadline())
+    except asyncio.CancelledError:
+        await _cancel(primary)
+        raise
+    if done:
+        result = primary.result()  # re-raises primary failure (caller falls back)
+        tracker.observe(time.perf_counter() - t0)
+        return result, 0
+
+    if not budget.try_spend():
+        result = await primary
+        tracker.observe(time.perf_counter() - t0)
+        return result, 0
+
+    log.info("HEDGE | %s | firing hedge after %.2fs", label, time.perf_counter() - t0)
+    attempts = [primary, asyncio.ensure_future(start())]
+    pending = set(attempts)
+    first_error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner = next((t for t in attempts if t in done and t.exception() is None), None)
+            for task in done:
+                if task.exception() is not None and first_error is None:
+                    first_error = task.exception()
+            if winner is None:
+                continue
+            tracker.observe(time.perf_counter() - t0)
+            idx = attempts.index(winner)
+            if idx == 1:
+                hedge_wins += 1
+            log.info("HEDGE | %s | winner=%s | ttft=%.2fs", label, "hedge" if idx else "primary", time.perf_counter() - t0)
+            return winner.result(), idx
+    finally:
+        for task in attempts:
+            if not task.done():
+                await _cancel(task)
+    assert first_error is not None
+    raise first_error
+
+
+async def hedged_call(make_call: Callable[[], Awaitable[T]], tracker: Optional[LatencyTracker]) -> T:
+    """Await ``make_call()``, hedging it when it outlives ``tracker``'s deadline.
+
+    ``tracker=None`` never hedges (calls too costly to send twice).
+    """
+    if not HEDGING_ENABLED or tracker is None:
+        return await make_call()
+    result, _ = await _race(make_call, tracker, tracker.name)
+    return result
+
+
+_EMPTY = object()
+
+
+async def _first_item(stream: AsyncIterator[T]) -> Any:
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return _EMPTY
+
+
+async def hedged_stream(open_stream: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+    """Yield from ``open_stream()``, hedging if its first item is late.
+
+    ``open_stream`` must return a fresh async generator per call; the losing
+    generator is closed with ``aclose()`` so its upstream connection is
+    released.
+    """
+    if not HEDGING_ENABLED:
+        async for item in open_stream():
+            yield item
+        return
+
+    streams: list[AsyncIterator[str]] = []
+
+    async def start() -> tuple[int, Any]:
+        stream = open_stream()
+        streams.append(stream)
+        idx = len(streams) - 1
+        return idx, await _first_item(stream)
+
+    try:
+        (idx, first), _ = await _race(start, ttft_tracker, "stream")
+    except BaseException:
+        for s in streams:
+            with contextlib.suppress(BaseException):
+                await s.aclose()  # type: ignore[attr-defined]
+        raise
+
+    winner = streams[idx]
+    for i, s in enumerate(streams):
+        if i != idx:
+            with contextlib.suppress(BaseException):
+                await s.aclose()  # type: ignore[attr-defined]
+
+    if first is _EMPTY:
+        return
+    try:
+        yield first
+        async for item in winner:
+            yield item
+    finally:
+        await winner.aclose()  # type: ignore[attr-defined]
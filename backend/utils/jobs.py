@@ -0,0 +1,318 @@
+"""Background job queue for ingest and update, persisted in SQLite.
+
+``/api/ingest`` and ``PUT /api/docs/{id}`` only record a job and return its
+id; a small pool of worker tasks does the translation, embedding and
+question generation. Job state and per-document progress live in a local
+SQLite file (``JOBS_DB``), so a restart re-queues whatever was queued or
+running and finished documents are not processed again.
+
+A job is a list of documents, up to ``JOB_DOC_CONCURRENCY`` of them
+processed at a time (which also lets their question generation share LLM
+calls, see backend/utils/question_batch.py). Each document moves through
+the stages ``queued → translating → embedding → questions → storing → done`` (or
+``failed``); the job is ``done`` when every document is, and is retried up
+to ``JOB_MAX_ATTEMPTS`` times otherwise. Deleting a document cancels it in
+every unfinished job (stage ``cancelled``), so a queued update cannot bring
+it back.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from backend.utils.constants import JOB_DOC_CONCURRENCY, JOB_MAX_ATTEMPTS, JOB_RETRY_BACKOFF, JOB_WORKERS
+from backend.utils.logger import log
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    payload     TEXT NOT NULL,
+    tenant      TEXT,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    error       TEXT,
+    created_by  TEXT,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_docs (
+    job_id      TEXT NOT NULL,
+    doc_id      TEXT NOT NULL,
+    position    INTEGER NOT NULL,
+    stage       TEXT NOT NULL,
+    result      TEXT,
+    error       TEXT,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (job_id, doc_id)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status);
+"""
+
+FINAL = ("done", "failed")
+
+# (job, doc) → awaitable; reports progress through the ``stage`` callback
+DocHandler = Callable[[str, Dict[str, Any], Callable[[str], Awaitable[None]]], Awaitable[Dict[str, Any]]]
+
+
+class JobStore:
+    """Synchronous SQLite access; call from a worker thread.
+
+    Every job belongs to the tenant of its documents; lookups given a
+    ``tenant`` only see that tenant's jobs.
+    """
+
+    def __init__(self, path: str, default_tenant: str = "") -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        with self._db:
+            if "tenant" not in {r["name"] for r in self._db.execute("PRAGMA table_info(jobs)")}:
+                self._db.execute("ALTER TABLE jobs ADD COLUMN tenant TEXT")
+            # Jobs queued before tenants run against the default tenant
+            self._db.execute("UPDATE jobs SET tenant = ? WHERE tenant IS NULL", (default_tenant,))
+        self._lock = threading.Lock()
+        self.default_tenant = default_tenant
+
+    def create(self, kind: str, docs: List[Dict[str, Any]], user: str) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, status, payload, tenant, created_by, created_at, updated_at)"
+                " VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(docs, ensure_ascii=False), docs[0].get("tenant") if docs else None,
+                 user, now, now),
+            )
+            self._db.executemany(
+                "INSERT INTO job_docs (job_id, doc_id, position, stage, updated_at) VALUES (?, ?, ?, 'queued', ?)",
+                [(job_id, d["id"], i, now) for i, d in enumerate(docs)],
+            )
+        return job_id
+
+    def set_job(self, job_id: str, status: str, *, error: Optional[str] = None, attempt: bool = False) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, error = ?, attempts = attempts + ?, updated_at = ? WHERE id = ?",
+                (status, error, int(attempt), time.time(), job_id),
+            )
+
+    def set_doc(
+        self, job_id: str, doc_id: str, stage: str,
+        *, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None,
+    ) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE job_docs SET stage = ?, result = ?, error = ?, updated_at = ? WHERE job_id = ? AND doc_id = ?",
+                (stage, json.dumps(result) if result is not None else None, error, time.time(), job_id, doc_id),
+            )
+
+    def doc_stage(self, job_id: str, doc_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT stage FROM job_docs WHERE job_id = ? AND doc_id = ?", (job_id, doc_id),
+            ).fetchone()
+        return row["stage"] if row else None
+
+    def cancel_doc(self, tenant: str, doc_id: str) -> int:
+        """Cancel ``doc_id`` in the tenant's unfinished jobs; returns how many."""
+        with self._lock, self._db:
+            cur = self._db.execute(
+                "UPDATE job_docs SET stage = 'cancelled', error = 'document deleted', updated_at = ?"
+                " WHERE doc_id = ? AND stage NOT IN ('done', 'cancelled') AND job_id IN"
+                " (SELECT id FROM jobs WHERE tenant = ? AND status NOT IN ('done', 'failed'))",
+                (time.time(), doc_id, tenant),
+            )
+        return cur.rowcount
+
+    def payload(self, job_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row["payload"]) if row else []
+
+    def get(self, job_id: str, tenant: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._db.execute(
+                "SELECT id, kind, status, tenant, attempts, error, created_by, created_at, updated_at FROM jobs"
+                " WHERE id = ? AND (? IS NULL OR tenant = ?)",
+                (job_id, tenant, tenant),
+            ).fetchone()
+            if job is None:
+                return None
+            docs = self._db.execute(
+                "SELECT doc_id, stage, result, error, updated_at FROM job_docs WHERE job_id = ? ORDER BY position",
+                (job_id,),
+            ).fetchall()
+        out = dict(job)
+        out["docs"] = [
+            {**dict(d), "result": json.loads(d["result"]) if d["result"] else None} for d in docs
+        ]
+        out["progress"] = {
+            "done": sum(d["stage"] == "done" for d in docs),
+            "failed": sum(d["stage"] == "failed" for d in docs),
+            "cancelled": sum(d["stage"] == "cancelled" for d in docs),
+            "total": len(docs),
+        }
+        return out
+
+    def recent(self, limit: int = 50, tenant: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, kind, status, tenant, attempts, error, created_by, created_at, updated_at"
+                " FROM jobs WHERE ? IS NULL OR tenant = ? ORDER BY created_at DESC LIMIT ?",
+                (tenant, tenant, limit),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def unfinished(self) -> List[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running', 'retrying') ORDER BY created_at"
+            ).fetchall()
+        return [r["id"] for r in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class JobQueue:
+    """Bounded worker pool over a :class:`JobStore`."""
+
+    def __init__(
+        self, store: JobStore, handler: DocHandler,
+        workers: int = JOB_WORKERS, doc_concurrency: int = JOB_DOC_CONCURRENCY,
+    ) -> None:
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.doc_concurrency = doc_concurrency
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._changed = asyncio.Condition()
+        self._doc_locks: Dict[tuple, asyncio.Lock] = {}
+        self._doc_lock_users: Dict[tuple, int] = {}  # holders + waiters per key
+
+    async def start(self) -> None:
+        # Anything queued or interrupted mid-run before the last shutdown
+        for job_id in await asyncio.to_thread(self.store.unfinished):
+            await asyncio.to_thread(self.store.set_job, job_id, "queued")
+            self._queue.put_nowait(job_id)
+            log.info("JOBS | recovered | job=%s", job_id)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.store.close()
+
+    async def submit(self, kind: str, docs: List[Dict[str, Any]], user: str) -> str:
+        job_id = await asyncio.to_thread(self.store.create, kind, docs, user)
+        self._queue.put_nowait(job_id)
+        log.info("JOBS | queued | job=%s | kind=%s | docs=%d | user=%s", job_id, kind, len(docs), user)
+        return job_id
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": len(self._tasks), "queued": self._queue.qsize()}
+
+    async def get(self, job_id: str, tenant: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, job_id, tenant)
+
+    async def wait_changed(self, timeout: float) -> None:
+        """Return after the next state change anywhere, or after ``timeout``."""
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    @asynccontextmanager
+    async def doc_lock(self, tenant: str, doc_id: str) -> AsyncIterator[None]:
+        """Hold the per-document lock; dropped once nobody holds or awaits it."""
+        key = (tenant, doc_id)
+        lock = self._doc_locks.setdefault(key, asyncio.Lock())
+        self._doc_lock_users[key] = self._doc_lock_users.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._doc_lock_users[key] -= 1
+            if not self._doc_lock_users[key]:
+                del self._doc_lock_users[key], self._doc_locks[key]
+
+    async def _notify(self) -> None:
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # bookkeeping failure — never kill the worker
+                log.error("JOBS | worker=%d | job=%s | err=%s", n, job_id, exc)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = await self.get(job_id)
+        if job is None or job["status"] in FINAL:
+            return
+        docs = {d["id"]: d for d in await asyncio.to_thread(self.store.payload, job_id)}
+        t0 = time.perf_counter()
+        await asyncio.to_thread(self.store.set_job, job_id, "running", attempt=True)
+        await self._notify()
+
+        failed: List[str] = []
+        sem = asyncio.Semaphore(self.doc_concurrency)
+
+        async def _doc(doc_id: str) -> None:
+            async def _stage(stage: str) -> None:
+                await asyncio.to_thread(self.store.set_doc, job_id, doc_id, stage)
+                await self._notify()
+
+            # Two jobs touching the same document (e.g. an update right after its
+            # ingest), or a job and a delete, must not interleave their steps
+            tenant = docs[doc_id].get("tenant") or self.store.default_tenant
+            try:
+                async with sem, self.doc_lock(tenant, doc_id):
+                    if await asyncio.to_thread(self.store.doc_stage, job_id, doc_id) == "cancelled":
+                        return  # deleted while this job waited
+                    result = await self.handler(job["kind"], docs[doc_id], _stage)
+                await asyncio.to_thread(self.store.set_doc, job_id, doc_id, "done", result=result)
+            except Exception as exc:
+                log.warning("JOBS | doc_failed | job=%s | doc=%s | attempt=%d | err=%s",
+                            job_id, doc_id, job["attempts"] + 1, exc)
+                await asyncio.to_thread(self.store.set_doc, job_id, doc_id, "failed", error=str(exc))
+                failed.append(doc_id)
+            await self._notify()
+
+        # Documents finished (or cancelled) in an earlier attempt are skipped
+        await asyncio.gather(*(_doc(e["doc_id"]) for e in job["docs"] if e["stage"] not in ("done", "cancelled")))
+
+        elapsed = time.perf_counter() - t0
+        if not failed:
+            await asyncio.to_thread(self.store.set_job, job_id, "done")
+            log.info("JOBS | done | job=%s | docs=%d | elapsed=%.2fs", job_id, len(docs), elapsed)
+        elif job["attempts"] + 1 >= JOB_MAX_ATTEMPTS:
+            await asyncio.to_thread(self.store.set_job, job_id, "failed", error=f"failed docs: {failed}")
+            log.error("JOBS | failed | job=%s | docs=%s | attempts=%d", job_id, failed, job["attempts"] + 1)
+        else:
+            await asyncio.to_thread(self.store.set_job, job_id, "retrying", error=f"failed docs: {failed}")
+            delay = JOB_RETRY_BACKOFF * 2 ** job["attempts"]
+            asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, job_id)
+        await self._notify()
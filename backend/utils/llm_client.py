@@ -0,0 +1,281 @@
+"""Shared OpenAI client layer with a circuit breaker per API path.
+
+Every LLM call in the app (``call_llm``, ``stream_llm``, ``translate_text``)
+goes through :func:`complete` or :func:`stream_deltas`. The two upstream paths
+— the Responses API and chat.completions — each have a breaker:
+
+* **closed**: requests flow; consecutive failures are counted.
+* **open**: after ``BREAKER_FAILURE_THRESHOLD`` consecutive failures the path
+  is skipped entirely for ``BREAKER_COOLDOWN`` seconds, so callers route
+  straight to the healthy path instead of paying a failed round trip first.
+* **half_open**: once the cool-down passes, a single real request is let
+  through as a probe; success closes the breaker, failure re-opens it.
+
+If every breaker is open, the path whose cool-down ends first is tried anyway
+rather than failing without a network attempt.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional
+
+from backend.utils.constants import BREAKER_COOLDOWN, BREAKER_FAILURE_THRESHOLD, MODEL
+from backend.utils.hedging import call_tracker, hedged_call, hedged_stream, hedging_stats
+from backend.utils.logger import log
+from backend.utils.settings import get_async_openai
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a timed cool-down and single probe."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        cooldown: float = BREAKER_COOLDOWN,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self._probe_started = 0.0
+        self._probe_in_flight = False
+        self.counters = {"success": 0, "failure": 0, "short_circuited": 0, "probes": 0, "opened": 0}
+
+    def retry_at(self) -> float:
+        return self.opened_at + self.cooldown
+
+    def allow(self) -> bool:
+        """Whether a request may use this path right now."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() >= self.retry_at():
+            self.state = HALF_OPEN
+        # A probe that never reported back (e.g. cancelled) goes stale after a cool-down
+        probe_stale = time.monotonic() - self._probe_started >= self.cooldown
+        if self.state == HALF_OPEN and (not self._probe_in_flight or probe_stale):
+            self._probe_in_flight = True
+            self._probe_started = time.monotonic()
+            self.counters["probes"] += 1
+            log.info("LLM | breaker=%s | probing", self.name)
+            return True
+        self.counters["short_circuited"] += 1
+        return False
+
+    def record_success(self) -> None:
+        self.counters["success"] += 1
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+        if self.state != CLOSED:
+            log.info("LLM | breaker=%s | closed", self.name)
+        self.state = CLOSED
+
+    def record_failure(self, exc: BaseException) -> None:
+        self.counters["failure"] += 1
+        self.consecutive_failures += 1
+        was_probe = self._probe_in_flight
+        self._probe_in_flight = False
+        if was_probe or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.counters["opened"] += 1
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            log.warning("LLM | breaker=%s | open for %.0fs | err=%s", self.name, self.cooldown, exc)
+
+    def snapshot(self) -> dict[str, Any]:
+        snap: dict[str, Any] = {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            **self.counters,
+        }
+        if self.state != CLOSED:
+            snap["retry_in_s"] = round(max(0.0, self.retry_at() - time.monotonic()), 1)
+        return snap
+
+
+# Preference order: Responses API first, chat.completions as the fallback
+RESPONSES, CHAT = "responses", "chat"
+breakers: dict[str, CircuitBreaker] = {RESPONSES: CircuitBreaker(RESPONSES), CHAT: CircuitBreaker(CHAT)}
+
+
+def llm_stats() -> dict[str, Any]:
+    """Breaker state and counters per API path, plus hedging stats."""
+    return {
+        "paths": {name: b.snapshot() for name, b in breakers.items()},
+        "hedging": hedging_stats(),
+    }
+
+
+def _route() -> Iterator[str]:
+    """Paths to try, in order, skipping those whose breaker is open.
+
+    Lazy, so a half-open path is only claimed for a probe when the paths
+    ahead of it have actually failed.
+    """
+    routed = False
+    for name, b in breakers.items():
+        if b.allow():
+            routed = True
+            yield name
+    if not routed:
+        # Everything is open — try the path whose cool-down ends first
+        yield min(breakers, key=lambda n: breakers[n].retry_at())
+
+
+def _messages(system_prompt: str, user_prompt: str) -> list[dict]:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Raw per-path calls
+# ---------------------------------------------------------------------------
+
+async def _responses_complete(
+    system_prompt: str, user_prompt: str, max_tokens: int, temperature: float, json_mode: bool = False,
+) -> str:
+    resp = await get_async_openai().responses.create(
+        model=MODEL,
+        input=_messages(system_prompt, user_prompt),
+        max_output_tokens=max_tokens,
+        timeout=30,
+        **({"text": {"format": {"type": "json_object"}}} if json_mode else {}),
+    )
+    return resp.output_text or ""
+
+
+async def _chat_complete(
+    system_prompt: str, user_prompt: str, max_tokens: int, temperature: float, json_mode: bool = False,
+) -> str:
+    cmpl = await get_async_openai().chat.completions.create(
+        model=MODEL,
+        messages=_messages(system_prompt, user_prompt),
+        temperature=temperature,
+        max_completion_tokens=max_tokens,
+        timeout=30,
+        **({"response_format": {"type": "json_object"}} if json_mode else {}),
+    )
+    return cmpl.choices[0].message.content or ""
+
+
+async def _responses_deltas(
+    system_prompt: str, user_prompt: str, max_tokens: int, temperature: float
+) -> AsyncIterator[str]:
+    """Text deltas from the Responses API stream; closes the stream on exit."""
+    resp = await get_async_openai().responses.create(
+        model=MODEL,
+        input=_messages(system_prompt, user_prompt),
+        stream=True,
+        max_output_tokens=max_tokens,
+        timeout=30,
+    )
+    try:
+        async for event in resp:
+            if getattr(event, "type", "") == "response.output_text.delta" and event.delta:
+                yield event.delta
+    finally:
+        await resp.close()
+
+
+async def _chat_deltas(
+    system_prompt: str, user_prompt: str, max_tokens: int, temperature: float
+) -> AsyncIterator[str]:
+    """Text deltas from the chat.completions stream; closes the stream on exit."""
+    cmpl = await get_async_openai().chat.completions.create(
+        model=MODEL,
+        messages=_messages(system_prompt, user_prompt),
+        stream=True,
+        temperature=temperature,
+        max_completion_tokens=max_tokens,
+        timeout=30,
+    )
+    try:
+        async for chunk in cmpl:
+            delta = chunk.choices[0].delta.content if chunk.choices else ""
+            if delta:
+                yield delta
+    finally:
+        await cmpl.close()
+
+
+_COMPLETE: dict[str, Callable[..., Awaitable[str]]] = {RESPONSES: _responses_complete, CHAT: _chat_complete}
+_STREAM: dict[str, Callable[..., AsyncIterator[str]]] = {RESPONSES: _responses_deltas, CHAT: _chat_deltas}
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+async def complete(
+    system_prompt: str,
+    user_prompt: str,
+    *,
+    max_tokens: int = 600,
+    temperature: float = 0.3,
+    json_mode: bool = False,
+    kind: Optional[str] = "call",
+) -> str:
+    """Non-streaming completion routed through the healthy API path.
+
+    ``json_mode`` asks the API for a single JSON object (the prompt must
+    mention JSON); callers still validate what comes back. ``kind`` names
+    the latency history the call is hedged against; ``None`` never hedges.
+    """
+    tracker = call_tracker(kind) if kind is not None else None
+    last_exc: Optional[Exception] = None
+    for name in _route():
+        try:
+            text = await hedged_call(
+                lambda: _COMPLETE[name](system_prompt, user_prompt, max_tokens, temperature, json_mode),
+                tracker,
+            )
+        except Exception as exc:
+            breakers[name].record_failure(exc)
+            last_exc = exc
+            continue
+        breakers[name].record_success()
+        return text
+    assert last_exc is not None
+    raise last_exc
+
+
+async def stream_deltas(
+    system_prompt: str,
+    user_prompt: str,
+    *,
+    max_tokens: int = 600,
+    temperature: float = 0.2,
+) -> AsyncIterator[str]:
+    """Stream text deltas from the healthy API path.
+
+    Falls over to the next path only if nothing has been yielded yet; a
+    failure mid-stream is recorded against the breaker and re-raised, since
+    restarting on another path would repeat text the client already has.
+    """
+    last_exc: Optional[Exception] = None
+    for name in _route():
+        started = False
+        try:
+            async for delta in hedged_stream(
+                lambda: _STREAM[name](system_prompt, user_prompt, max_tokens, temperature)
+            ):
+                started = True
+                yield delta
+        except Exception as exc:
+            breakers[name].record_failure(exc)
+            if started:
+                raise
+            last_exc = exc
+            continue
+        breakers[name].record_success()
+        return
+    assert last_exc is not None
+    raise last_exc
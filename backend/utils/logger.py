@@ -1,6 +1,13 @@
+import atexit
+import copy
+import json
 import logging
 import os
-from logging.handlers import TimedRotatingFileHandler
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from typing import Any, Dict, Optional
 
 # Log directory: prefer LOG_DIR env var, fall back to repo-local ./logs
 LOG_DIR = os.getenv("LOG_DIR", "./logs")
@@ -8,6 +15,13 @@ os.makedirs(LOG_DIR, exist_ok=True)
 
 LOG_FILE = os.path.join(LOG_DIR, "api.log")
 
+LOG_LEVEL  = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()     # "text" | "json"
+# Sampling for high-volume lines: "PREFIX=rate,..." where PREFIX matches the
+# start of the message (e.g. "RELEVANCE=0.1,ASK | source=0.25").
+LOG_SAMPLE = os.getenv("LOG_SAMPLE", "")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
 # Log format: timestamp | level | message
 _FORMATTER = logging.Formatter(
     fmt="%(asctime)s | %(levelname)-8s | %(message)s",
@@ -15,14 +29,100 @@ _FORMATTER = logging.Formatter(
 )
 
 
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; ``event`` is the message's leading tag (``ASK``, ``INGEST``…)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        msg = record.getMessage()
+        entry: Dict[str, Any] = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "event": msg.split(" |", 1)[0].strip(),
+            "msg": msg,
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SampleFilter(logging.Filter):
+    """Keep only a fraction of sub-WARNING records whose message starts with a
+    configured prefix. Runs in the caller before the record is queued."""
+
+    def __init__(self, rates: Dict[str, float]) -> None:
+        super().__init__()
+        # Longest prefix first so "ASK | source" wins over "ASK"
+        self.rates = sorted(rates.items(), key=lambda kv: -len(kv[0]))
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not isinstance(record.msg, str):
+            return True
+        for prefix, rate in self.rates:
+            if record.msg.startswith(prefix):
+                if random.random() < rate:
+                    return True
+                self.dropped += 1
+                return False
+        return True
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full
+    instead of blocking or printing a traceback on the caller's thread."""
+
+    def __init__(self, q: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # QueueHandler.prepare folds the traceback into ``msg`` and clears
+        # ``exc_text``; keep it apart so JsonFormatter can emit it as "exc"
+        # (the text formatter appends ``exc_text`` to the line either way)
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _FORMATTER.formatException(record.exc_info)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _parse_sample(spec: str) -> Dict[str, float]:
+    rates: Dict[str, float] = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        prefix, _, rate = part.rpartition("=")
+        try:
+            rates[prefix.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[_DroppingQueueHandler] = None
+_sampler: Optional[SampleFilter] = None
+_stop_lock = threading.Lock()
+
+
 def _build_logger() -> logging.Logger:
+    global _listener, _queue_handler, _sampler
+
     logger = logging.getLogger("portfoliochat")
-    logger.setLevel(logging.INFO)
+    logger.setLevel(LOG_LEVEL)
 
     if logger.handlers:
         # Avoid adding duplicate handlers on hot-reload
         return logger
 
+    formatter = JsonFormatter() if LOG_FORMAT == "json" else _FORMATTER
+
     # File handler: rotates daily, keeps 14 days of history
     file_handler = TimedRotatingFileHandler(
         LOG_FILE,
@@ -31,18 +131,51 @@ def _build_logger() -> logging.Logger:
         backupCount=14,
         encoding="utf-8",
     )
-    file_handler.setFormatter(_FORMATTER)
+    file_handler.setFormatter(formatter)
     file_handler.suffix = "%Y-%m-%d"
 
     # Console handler: also prints to stdout (visible in Docker logs)
     console_handler = logging.StreamHandler()
-    console_handler.setFormatter(_FORMATTER)
+    console_handler.setFormatter(formatter)
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    # Request code only enqueues; disk and stdout writes happen on the
+    # listener's background thread.
+    _queue_handler = _DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    _listener = QueueListener(
+        _queue_handler.queue, file_handler, console_handler, respect_handler_level=True
+    )
+    _listener.start()
+    logger.addHandler(_queue_handler)
+
+    rates = _parse_sample(LOG_SAMPLE)
+    if rates:
+        _sampler = SampleFilter(rates)
+        logger.addFilter(_sampler)
 
+    atexit.register(shutdown_logging)
     return logger
 
 
+def shutdown_logging() -> None:
+    """Drain the queue and stop the writer thread. Safe to call more than once."""
+    global _listener
+    with _stop_lock:
+        if _listener is None:
+            return
+        _listener.stop()  # processes everything already queued, then joins
+        for h in _listener.handlers:
+            h.flush()
+        _listener = None
+
+
+def logging_stats() -> Dict[str, Any]:
+    return {
+        "format": LOG_FORMAT,
+        "queued": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped_full": _queue_handler.dropped if _queue_handler else 0,
+        "dropped_sampled": _sampler.dropped if _sampler else 0,
+    }
+
+
 # Single shared logger instance — import this everywhere
 log = _build_logger()
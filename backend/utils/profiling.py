@@ -0,0 +1,212 @@
+"""On-demand profiling of single requests, for admins.
+
+A request carrying ``X-Profile: 1`` (or ``?profile=1``) and a valid admin
+JWT is run under a sampling profiler: every ``PROFILE_INTERVAL`` seconds a
+background thread records the busy stacks of the event loop thread and the
+``asyncio.to_thread`` workers, until the response has been fully sent.
+``X-Profile: alloc`` / ``?profile=alloc`` also records tracemalloc
+allocation deltas for the request.
+
+Stacks are stored in the folded format (``thread;outer;inner count``) that
+flamegraph.pl, speedscope and most flamegraph viewers read directly. The
+last ``PROFILE_RING_SIZE`` profiles are kept in memory and served by
+``/api/admin/profiles``.
+
+Requests without the flag only pay for one header lookup. Since the event
+loop thread is shared, samples of a profiled request also include anything
+else the loop ran meanwhile; profile on a quiet instance for clean results.
+Only one request is profiled at a time.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException
+
+from backend.routes.auth import require_jwt
+from backend.utils.constants import PROFILE_INTERVAL, PROFILE_RING_SIZE
+from backend.utils.logger import log
+
+_busy = threading.Lock()
+profiles: Deque[Dict[str, Any]] = deque(maxlen=PROFILE_RING_SIZE)
+
+
+# Leaf frames of a thread that is parked waiting for work
+_IDLE = {
+    ("selectors.py", "select"),      # event loop with nothing to run
+    ("thread.py", "_worker"),        # to_thread pool worker waiting for a job
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+}
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Periodically records the busy Python stacks of the event loop thread
+    and the ``asyncio.to_thread`` worker threads."""
+
+    def __init__(self, loop_thread: int, interval: float = PROFILE_INTERVAL) -> None:
+        self.loop_thread = loop_thread
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self.idle = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _watched(self) -> Dict[int, str]:
+        return {
+            t.ident: t.name for t in threading.enumerate()
+            if t.ident == self.loop_thread or t.name.startswith("asyncio_")
+        }
+
+    def _run(self) -> None:
+        watched = self._watched()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            frames = sys._current_frames()
+            if any(tid not in frames for tid in watched):
+                watched = self._watched()
+            for tid, name in watched.items():
+                frame = frames.get(tid)
+                if frame is None:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE:
+                    if tid == self.loop_thread:
+                        self.idle += 1
+                    continue
+                labels: List[str] = []
+                while frame is not None:
+                    labels.append(_label(frame))
+                    frame = frame.f_back
+                labels.append(name)
+                self.stacks[";".join(reversed(labels))] += 1
+
+
+def _wants_profile(scope: dict) -> Optional[str]:
+    """``"cpu"`` / ``"alloc"`` if the request asks to be profiled, else None."""
+    flag = None
+    for name, value in scope.get("headers", ()):
+        if name == b"x-profile":
+            flag = value.decode("latin-1")
+            break
+    if flag is None and b"profile=" in scope.get("query_string", b""):
+        flag = parse_qs(scope["query_string"].decode("latin-1")).get("profile", [None])[0]
+    if not flag or flag in ("0", "false"):
+        return None
+    return "alloc" if flag == "alloc" else "cpu"
+
+
+async def _is_admin(scope: dict) -> bool:
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            try:
+                await require_jwt(value.decode("latin-1"))
+                return True
+            except HTTPException:
+                return False
+    return False
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware, so streamed responses are profiled to the last byte."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        mode = _wants_profile(scope) if scope["type"] == "http" else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+        if not await _is_admin(scope) or not _busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:10]
+        status: Dict[str, int] = {}
+
+        async def _send(message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        started_alloc = mode == "alloc" and not tracemalloc.is_tracing()
+        if started_alloc:
+            tracemalloc.start(25)
+        before = tracemalloc.take_snapshot() if mode == "alloc" else None
+        sampler = SamplingProfiler(threading.get_ident())
+        t0 = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            sampler.stop()
+            duration = time.perf_counter() - t0
+            allocations = None
+            if before is not None:
+                ignore = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)]
+                after = tracemalloc.take_snapshot().filter_traces(ignore)
+                before = before.filter_traces(ignore)
+                allocations = [
+                    {"where": str(s.traceback[0]), "size_diff": s.size_diff, "count_diff": s.count_diff}
+                    for s in after.compare_to(before, "lineno")[:30]
+                ]
+                peak = tracemalloc.get_traced_memory()[1]
+                if started_alloc:
+                    tracemalloc.stop()
+            _busy.release()
+
+            profiles.append({
+                "id": profile_id,
+                "method": scope.get("method"),
+                "path": scope.get("path"),
+                "status": status.get("code"),
+                "mode": mode,
+                "created_at": time.time(),
+                "duration_ms": round(1000 * duration, 1),
+                "interval_ms": 1000 * sampler.interval,
+                "samples": sampler.samples,
+                "loop_idle_samples": sampler.idle,
+                "stacks": dict(sampler.stacks.most_common()),
+                "allocations": allocations,
+                "peak_traced_bytes": peak if before is not None else None,
+            })
+            log.info("PROFILE | id=%s | path=%s | mode=%s | ms=%.0f | samples=%d",
+                     profile_id, scope.get("path"), mode, 1000 * duration, sampler.samples)
+
+
+def profile_summaries() -> List[Dict[str, Any]]:
+    keep = ("id", "method", "path", "status", "mode", "created_at", "duration_ms", "samples")
+    return [{k: p[k] for k in keep} for p in reversed(profiles)]
+
+
+def find_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    return next((p for p in profiles if p["id"] == profile_id), None)
+
+
+def folded(profile: Dict[str, Any]) -> str:
+    """Collapsed stacks, one ``frame;frame;frame count`` line each."""
+    return "".join(f"{stack} {n}\n" for stack, n in profile["stacks"].items())
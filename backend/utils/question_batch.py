@@ -0,0 +1,172 @@
+"""Question generation for ingest, batched across documents.
+
+Documents that reach the question stage at about the same time (the job
+worker processes a job's documents concurrently) are packed into one LLM
+call, up to ``QUESTION_BATCH_TOKENS`` of input and
+``QUESTION_BATCH_MAX_DOCS`` documents. The model answers with one JSON
+object keyed by document id. Each document's entry is validated on its
+own; only documents whose questions are missing or malformed fall back to
+the single-document prompt, so one bad entry does not cost the batch.
+
+Documents larger than half the budget, or alone when the
+``QUESTION_BATCH_WAIT`` window closes, use the single-document prompt
+directly. A batch that fails outright
+(e.g. the API is down) fails every document in it, like a single call
+would, so the job retries them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.utils.constants import (
+    QUESTION_BATCH_MAX_DOCS, QUESTION_BATCH_SYSTEM_PROMPT, QUESTION_BATCH_TOKENS,
+    QUESTION_BATCH_WAIT, QUESTION_SYSTEM_PROMPT, QUESTION_TOKENS_PER_DOC,
+)
+from backend.utils.llm_client import complete
+from backend.utils.logger import log
+
+CHARS_PER_TOKEN = 4
+_MAX_OUTPUT_TOKENS = 8000
+
+
+def parse_question_lines(raw: str) -> List[str]:
+    """Split the LLM's one-question-per-line output into clean questions."""
+    return [ln.strip(" -•\t") for ln in raw.splitlines() if ln.strip()]
+
+
+def _tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _batch_prompt(docs: List[Tuple[str, str]]) -> str:
+    blocks = [f"--- DOCUMENT {doc_id} START ---\n{text}\n--- DOCUMENT {doc_id} END ---" for doc_id, text in docs]
+    return "\n\n".join(blocks) + f"\n\nDocument ids: {json.dumps([d for d, _ in docs], ensure_ascii=False)}"
+
+
+def parse_batch(raw: str) -> Dict[str, List[str]]:
+    """The valid entries of a batched JSON answer: doc id → non-empty list of questions."""
+    start, end = raw.find("{"), raw.rfind("}")
+    if start < 0 or end <= start:
+        return {}
+    try:
+        data = json.loads(raw[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    out: Dict[str, List[str]] = {}
+    for doc_id, qs in data.items():
+        if not isinstance(qs, list) or not all(isinstance(q, str) for q in qs):
+            continue
+        clean = [q.strip(" -•\t") for q in qs if q.strip(" -•\t")]
+        if clean:
+            out[str(doc_id)] = clean
+    return out
+
+
+class QuestionBatcher:
+    """Coalesces concurrent question-generation requests into batched calls."""
+
+    def __init__(
+        self,
+        budget: int = QUESTION_BATCH_TOKENS,
+        max_docs: int = QUESTION_BATCH_MAX_DOCS,
+        wait: float = QUESTION_BATCH_WAIT,
+    ) -> None:
+        self.budget = budget
+        self.max_docs = max_docs
+        self.wait = wait
+        self._pending: List[Tuple[str, str, asyncio.Future]] = []
+        self._pending_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+        self.counters = {
+            "llm_calls": 0, "batches": 0, "batched_docs": 0, "single_docs": 0, "fallback_docs": 0,
+        }
+
+    async def generate(self, doc_id: str, text: str) -> List[str]:
+        """Questions for one document; may share an LLM call with other documents."""
+        n = _tokens(text)
+        if self.budget <= 0 or n > self.budget // 2:
+            return await self._single(doc_id, text)
+
+        if (any(d == doc_id for d, _, _ in self._pending)
+                or self._pending_tokens + n > self.budget or len(self._pending) >= self.max_docs):
+            self._flush()
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((doc_id, text, fut))
+        self._pending_tokens += n
+        if len(self._pending) >= self.max_docs:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.wait, self._flush)
+        return await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _single(self, doc_id: str, text: str) -> List[str]:
+        self.counters["llm_calls"] += 1
+        self.counters["single_docs"] += 1
+        raw = await complete(QUESTION_SYSTEM_PROMPT, text, max_tokens=800, temperature=0.3, kind="questions")
+        return parse_question_lines(raw)
+
+    async def _settle(self, fut: asyncio.Future, doc_id: str, text: str) -> None:
+        try:
+            result = await self._single(doc_id, text)
+        except Exception as exc:
+            if not fut.done():
+                fut.set_exception(exc)
+            return
+        if not fut.done():
+            fut.set_result(result)
+
+    async def _run(self, batch: List[Tuple[str, str, asyncio.Future]]) -> None:
+        if len(batch) == 1:
+            await self._settle(batch[0][2], batch[0][0], batch[0][1])
+            return
+
+        docs = [(doc_id, text) for doc_id, text, _ in batch]
+        self.counters["llm_calls"] += 1
+        self.counters["batches"] += 1
+        try:
+            raw = await complete(
+                QUESTION_BATCH_SYSTEM_PROMPT,
+                _batch_prompt(docs),
+                max_tokens=min(_MAX_OUTPUT_TOKENS, QUESTION_TOKENS_PER_DOC * len(docs)),
+                temperature=0.3,
+                json_mode=True,
+                kind=None,  # several documents' worth of output: never sent twice
+            )
+        except Exception as exc:
+            for _, _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+
+        parsed = parse_batch(raw)
+        missing = [(doc_id, text, fut) for doc_id, text, fut in batch if doc_id not in parsed]
+        for doc_id, _, fut in batch:
+            if doc_id in parsed and not fut.done():
+                fut.set_result(parsed[doc_id])
+        self.counters["batched_docs"] += len(batch) - len(missing)
+        self.counters["fallback_docs"] += len(missing)
+        log.info("QUESTIONS | batch | docs=%d | ok=%d | fallback=%d", len(batch), len(batch) - len(missing), len(missing))
+        # Only the documents the batch did not answer properly cost another call
+        await asyncio.gather(*(self._settle(fut, doc_id, text) for doc_id, text, fut in missing))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"pending": len(self._pending), **self.counters}
+
+
+question_batcher = QuestionBatcher()
@@ -1,11 +1,39 @@
 # backend/utils/responses.py
+import contextlib
 import json
 import time
-from typing import List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any
 import asyncio
 
-from backend.utils.settings import get_async_openai
-from backend.utils.constants import MODEL, SECURE_SYSTEM_PROMPT
+from starlette.requests import Request
+
+from backend.utils.analytics import log_event
+from backend.utils.constants import SECURE_SYSTEM_PROMPT
+from backend.utils.llm_client import complete, stream_deltas
+from backend.utils.logger import log
+
+_CHUNK_PREFIX = '{"type": "chunk"'
+
+
+class StreamTally:
+    """Chunk events an upstream stream has produced (one model delta ≈ one token each).
+
+    ``shared`` is how many other clients still read the same upstream (see
+    backend/utils/single_flight.py); a client leaving while it is non-zero
+    has not abandoned the upstream.
+    """
+
+    __slots__ = ("generated",)
+    shared = 0
+
+    def __init__(self) -> None:
+        self.generated = 0
+
+
+# Per route: streams completed / failed / abandoned by the client, and for
+# the abandoned ones the chunks generated upstream vs. delivered to the client.
+# A client leaving a shared upstream that others still read is "detached".
+stream_stats: Dict[str, Dict[str, int]] = {}
 
 
 async def call_llm(system_prompt: str, user_prompt: str, max_tokens: int = 600) -> str:
@@ -14,31 +42,7 @@ async def call_llm(system_prompt: str, user_prompt: str, max_tokens: int = 600)
     Used for ingest-time preprocessing (e.g. question generation) where we
     need the complete output before continuing, not a stream of chunks.
     """
-    client = get_async_openai()
-    try:
-        resp = await client.responses.create(
-            model=MODEL,
-            input=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            max_output_tokens=max_tokens,
-            timeout=30,
-        )
-        return resp.output_text or ""
-    except Exception:
-        # fallback to chat.completions
-        cmpl = await client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.3,
-            max_completion_tokens=max_tokens,
-            timeout=30,
-        )
-        return cmpl.choices[0].message.content or ""
+    return await complete(system_prompt, user_prompt, max_tokens=max_tokens, temperature=0.3)
 
 
 async def stream_llm(
@@ -50,6 +54,7 @@ async def stream_llm(
     max_tokens: int = 600,
     throttle_sec: float = 0.1,
     context_embedding: Optional[List[float]] = None,
+    tally: Optional[StreamTally] = None,
 ):
     """
     Generic streaming helper.
@@ -64,52 +69,113 @@ async def stream_llm(
 
     system_instr = system_prompt or SECURE_SYSTEM_PROMPT
 
-    try:
-        # OpenAI responses API – streaming
-        resp = await get_async_openai().responses.create(
-            model=MODEL,
-            input=[
-                {"role": "system", "content": system_instr},
-                {"role": "user", "content": user_prompt},
-            ],
-            stream=True,
-            max_output_tokens=max_tokens,
-            timeout=30
-        )
-        async for event in resp:
-            delta = event.output_text_delta
-            if delta:
-                if throttle_sec:
-                    await asyncio.sleep(throttle_sec)
-                yield json.dumps(
-                    {"type": "chunk", "data": delta},
-                    ensure_ascii=False,
-                ) + "\n"
-
-    except Exception:
-        # fallback to chat.completions streaming
-        cmpl = await get_async_openai().chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "system", "content": system_instr},
-                {"role": "user", "content": user_prompt},
-            ],
-            stream=True,
-            temperature=temperature,
-            max_completion_tokens=max_tokens,
-            timeout=30
-
-        )
-        async for chunk in cmpl:
-            delta = chunk.choices[0].delta.content or ""
-            if delta:
-                yield json.dumps(
-                    {"type": "chunk", "data": delta},
-                    ensure_ascii=False,
-                ) + "\n"
+    # Routed to whichever API path is currently healthy (see llm_client)
+    async for delta in stream_deltas(
+        system_instr, user_prompt, max_tokens=max_tokens, temperature=temperature
+    ):
+        if tally is not None:
+            tally.generated += 1
+        if throttle_sec:
+            await asyncio.sleep(throttle_sec)
+        yield json.dumps(
+            {"type": "chunk", "data": delta},
+            ensure_ascii=False,
+        ) + "\n"
 
     # after text – send sources and the updated context embedding
     payload: dict[str, Any] = {"type": "sources", "data": ctx_sources}
     if context_embedding is not None:
         payload["context_embedding"] = context_embedding
     yield json.dumps(payload, ensure_ascii=False) + "\n"
+
+
+async def _client_gone(request: Request) -> None:
+    # The request body has been read already; the next message is the disconnect
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def until_disconnect(
+    request: Request,
+    body: AsyncIterator[str],
+    *,
+    route: str,
+    tally: Optional[StreamTally] = None,
+    question: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """Re-yield ``body`` until it ends or the client disconnects.
+
+    A disconnect is noticed while ``body`` is still waiting for its next
+    item (the LLM, a throttle sleep), not only at the next failed send: the
+    pending step is cancelled, which closes ``body`` and the upstream stream
+    beneath it. Abandoned streams are counted in ``stream_stats`` and logged
+    to analytics with the chunks generated upstream vs. delivered.
+    """
+    watcher = asyncio.ensure_future(_client_gone(request))
+    it = body.__aiter__()
+    outcome = "abandoned"  # unless the body ends or fails on its own
+    delivered = 0
+    step: Optional[asyncio.Future] = None
+    t0 = time.perf_counter()
+    try:
+        while True:
+            step = asyncio.ensure_future(it.__anext__())
+            await asyncio.wait({step, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if not step.done():
+                step.cancel()
+                with contextlib.suppress(BaseException):
+                    await step
+                break
+            try:
+                item = step.result()
+            except StopAsyncIteration:
+                outcome = "completed"
+                break
+            except Exception:
+                outcome = "failed"
+                raise
+            if item.startswith(_CHUNK_PREFIX):
+                delivered += 1
+            yield item
+    finally:
+        watcher.cancel()
+        if step is not None and not step.done():
+            step.cancel()  # the server cancelled us mid-step; cancelling the step closes ``body``
+        elif outcome == "abandoned":
+            # Own task: the response's task may be cancelled by the server meanwhile
+            asyncio.ensure_future(_close_quietly(body))
+        _record(request, route, outcome, tally, delivered, question, time.perf_counter() - t0)
+
+
+async def _close_quietly(body: AsyncIterator[str]) -> None:
+    with contextlib.suppress(Exception):
+        await body.aclose()  # type: ignore[attr-defined]
+
+
+def _record(
+    request: Request, route: str, outcome: str, tally: Optional[StreamTally],
+    delivered: int, question: Optional[str], elapsed: float,
+) -> None:
+    stats = stream_stats.setdefault(
+        route, {"completed": 0, "failed": 0, "abandoned": 0, "detached": 0,
+                "abandoned_generated": 0, "abandoned_delivered": 0},
+    )
+    if outcome == "abandoned" and tally is not None and tally.shared:
+        outcome = "detached"  # the upstream goes on for the others: counted by whoever leaves last
+    stats[outcome] += 1
+    if outcome != "abandoned":
+        return
+    generated = tally.generated if tally is not None else delivered
+    stats["abandoned_generated"] += generated
+    stats["abandoned_delivered"] += delivered
+    log.info("STREAM | abandoned | route=%s | generated=%d | delivered=%d | ms=%.0f",
+             route, generated, delivered, 1000 * elapsed)
+    asyncio.ensure_future(log_event(
+        getattr(request.app.state, "pg_pool", None),
+        event_type=f"{route}_abandoned",
+        ip=request.client.host if request.client else "unknown",
+        question=question,
+        latency_ms=1000 * elapsed,
+        tokens_generated=generated,
+        tokens_delivered=delivered,
+    ))
@@ -1,3 +1,4 @@
+import json
 import os
 from functools import lru_cache
 
@@ -8,6 +9,8 @@ load_dotenv()
 from openai import AsyncOpenAI
 import chromadb
 
+from backend.utils.constants import TENANT_CHROMA_BUDGET
+
 
 @lru_cache(maxsize=1)
 def get_async_openai() -> AsyncOpenAI:
@@ -29,5 +32,44 @@ except OSError:
     PERSIST_DIR = FALLBACK_PERSIST
     os.makedirs(PERSIST_DIR, exist_ok=True)
 
-chroma = chromadb.PersistentClient(path=PERSIST_DIR)
-coll = chroma.get_or_create_collection("portfolio_docs")
+# Tenant list (backend/utils/tenants.py); unset → a single default tenant on
+# the original "portfolio_docs" collection.
+TENANTS_FILE = os.getenv("TENANTS_FILE", "")
+
+
+def _configured_tenants() -> int:
+    if not TENANTS_FILE:
+        return 1
+    try:
+        with open(TENANTS_FILE, encoding="utf-8") as f:
+            return len(json.load(f).get("tenants", []))
+    except (OSError, ValueError):
+        return 1  # load_tenants reports the broken file
+
+
+# CHROMA_MEMORY_LIMIT (bytes) makes Chroma keep collection segments in an LRU
+# under that budget, so many tenants' HNSW indexes need not all stay loaded.
+# With more than one tenant it defaults to TENANT_CHROMA_BUDGET; 0 turns it off.
+CHROMA_MEMORY_LIMIT = int(os.getenv(
+    "CHROMA_MEMORY_LIMIT", str(TENANT_CHROMA_BUDGET if _configured_tenants() > 1 else 0),
+))
+chroma = chromadb.PersistentClient(
+    path=PERSIST_DIR,
+    settings=chromadb.Settings(
+        chroma_segment_cache_policy="LRU",
+        chroma_memory_limit_bytes=CHROMA_MEMORY_LIMIT,
+    ) if CHROMA_MEMORY_LIMIT else chromadb.Settings(),
+)
+
+# Question retrieval engine: "chroma" (HNSW, default) or "ivf" (quantized
+# memory-mapped index in backend/utils/vector_index.py, built from Chroma).
+RETRIEVAL_ENGINE = os.getenv("RETRIEVAL_ENGINE", "chroma").strip().lower()
+INDEX_DIR = os.getenv("INDEX_DIR", os.path.join(PERSIST_DIR, "question_index"))
+
+# Knowledge-base snapshots (backend/utils/snapshot.py) live next to the Chroma
+# data so they share its persistent volume.
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(PERSIST_DIR, "snapshots"))
+
+# Ingest job queue state (backend/utils/jobs.py), persisted next to Chroma so
+# queued jobs survive a restart.
+JOBS_DB = os.getenv("JOBS_DB", os.path.join(PERSIST_DIR, "jobs.sqlite3"))
@@ -0,0 +1,191 @@
+"""Single-flight coalescing of identical concurrent asks.
+
+When a shared link sends many visitors to the same suggested question
+within seconds, only the first request (the leader) embeds, retrieves and
+opens an LLM stream. Requests for the same tenant, normalized question and
+context arriving while that flight is in the air attach to it as
+subscribers: each gets every NDJSON line the upstream has produced so far
+(a replay), then the new ones as they arrive.
+
+The upstream is driven by its own task, not by any one client, so a
+subscriber leaving does not affect the others; it is cancelled only when
+the last subscriber disconnects. A flight is forgotten as soon as its
+stream ends, so later requests start a fresh one. If the leader fails
+before streaming (e.g. retrieval is overloaded), waiting subscribers fall
+back to serving themselves.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from backend.utils.logger import log
+from backend.utils.speculation import context_fingerprint
+
+
+class Flight:
+    """One upstream answer stream and its buffered NDJSON lines."""
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self.lines: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.sources_count = 0
+        self.tally: Any = None    # the leader's StreamTally (backend/utils/responses.py)
+        self.ready: asyncio.Future = asyncio.get_running_loop().create_future()  # upstream started
+        self.subscribers = 0
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def _notify(self) -> None:
+        wake, self._wake = self._wake, asyncio.Event()
+        wake.set()
+
+
+class Subscription:
+    """One client's view of a flight; ``leave()`` is idempotent."""
+
+    def __init__(self, registry: "SingleFlight", flight: Flight) -> None:
+        self._registry = registry
+        self.flight = flight
+        self._left = False
+        flight.subscribers += 1
+
+    async def stream(self) -> AsyncIterator[str]:
+        flight, i = self.flight, 0
+        try:
+            while True:
+                wake = flight._wake
+                if i < len(flight.lines):
+                    yield flight.lines[i]
+                    i += 1
+                elif flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                else:
+                    await wake.wait()
+        finally:
+            self.leave()
+
+    @property
+    def tally(self) -> "SubscriberTally":
+        return SubscriberTally(self)
+
+    def leave(self) -> None:
+        if self._left:
+            return
+        self._left = True
+        self._registry._leave(self.flight)
+
+
+class SubscriberTally:
+    """The flight's StreamTally as one subscriber reports it to ``until_disconnect``.
+
+    ``shared`` counts the flight's other subscribers, whether or not this one
+    has left yet, so only the last client to leave records the flight's
+    generated chunks as abandoned.
+    """
+
+    def __init__(self, sub: Subscription) -> None:
+        self._sub = sub
+
+    @property
+    def generated(self) -> int:
+        tally = self._sub.flight.tally
+        return tally.generated if tally is not None else 0
+
+    @property
+    def shared(self) -> int:
+        return self._sub.flight.subscribers - (0 if self._sub._left else 1)
+
+
+class SingleFlight:
+    """Registry of in-flight asks by coalescing key."""
+
+    def __init__(self) -> None:
+        self._flights: Dict[str, Flight] = {}
+        self.counters = {"flights": 0, "joined": 0, "replayed_lines": 0, "cancelled": 0, "fallbacks": 0}
+
+    @staticmethod
+    def key(tenant: str, question: str, context_embedding: Optional[list[float]]) -> str:
+        normalized = " ".join(question.split()).casefold()
+        raw = f"{tenant}\x00{normalized}\x00{context_fingerprint(context_embedding)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def join(self, key: str) -> Optional[Subscription]:
+        """Attach to the flight for ``key`` once it streams; None if there is none
+        or its leader failed before streaming."""
+        flight = self._flights.get(key)
+        if flight is None:
+            return None
+        try:
+            await asyncio.shield(flight.ready)
+        except Exception:
+            self.counters["fallbacks"] += 1
+            return None
+        if flight.done and flight.error is not None:
+            return None
+        self.counters["joined"] += 1
+        self.counters["replayed_lines"] += len(flight.lines)
+        return Subscription(self, flight)
+
+    def begin(self, key: str) -> Flight:
+        """A new flight; registered for others to join unless one already is."""
+        flight = Flight(key)
+        self._flights.setdefault(key, flight)
+        return flight
+
+    def abort(self, flight: Flight, exc: BaseException) -> None:
+        """The leader failed before streaming; waiting subscribers serve themselves."""
+        self._forget(flight)
+        if not flight.ready.done():
+            flight.ready.set_exception(exc)
+            flight.ready.exception()  # retrieved: nobody may be waiting
+
+    def run(self, flight: Flight, source: AsyncIterator[str]) -> Subscription:
+        """Start pumping ``source`` into ``flight``; returns the leader's subscription."""
+        self.counters["flights"] += 1
+        sub = Subscription(self, flight)
+        flight._task = asyncio.create_task(self._pump(flight, source))
+        flight.ready.set_result(None)
+        return sub
+
+    async def _pump(self, flight: Flight, source: AsyncIterator[str]) -> None:
+        try:
+            async for line in source:
+                flight.lines.append(line)
+                flight._notify()
+        except asyncio.CancelledError as exc:
+            flight.error = exc
+            raise
+        except Exception as exc:
+            log.warning("SINGLE_FLIGHT | upstream_failed | subscribers=%d | err=%s", flight.subscribers, exc)
+            flight.error = exc
+        finally:
+            flight.done = True
+            self._forget(flight)
+            flight._notify()
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()  # releases whatever the source holds (LLM slot, HTTP stream)
+
+    def _leave(self, flight: Flight) -> None:
+        flight.subscribers -= 1
+        if flight.subscribers <= 0 and not flight.done and flight._task is not None:
+            self.counters["cancelled"] += 1
+            self._forget(flight)
+            flight._task.cancel()
+
+    def _forget(self, flight: Flight) -> None:
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._flights), **self.counters}
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,214 @@
+"""Binary snapshots of the knowledge base for fast restore.
+
+A snapshot is a single uncompressed ``.npz`` file holding every collection
+entry — document chunks, generated questions, their metadata and embeddings —
+as flat columns:
+
+* ``embeddings``            float32 (n, dim)
+* ``ids`` / ``documents`` / ``metadatas``   UTF-8 blobs (``*_blob``, uint8)
+  with int64 end offsets (``*_off``); metadatas are one JSON object per entry
+* ``header``                UTF-8 JSON: format version, creation time, counts,
+  dimension and a SHA-256 over every other column
+
+Import verifies the checksum and bulk-writes the columns straight into the
+collection: no embedding model, no translation, no LLM calls. The question
+rows can also seed the quantized index directly (see
+:func:`question_vectors`).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+import zipfile
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.utils.logger import log
+
+FORMAT_VERSION = 1
+_COLUMNS = ("ids_blob", "ids_off", "documents_blob", "documents_off", "metadatas_blob", "metadatas_off", "embeddings")
+
+
+class SnapshotError(ValueError):
+    """Raised for unreadable, unsupported or corrupted snapshot files."""
+
+
+@dataclass
+class Snapshot:
+    ids: List[str]
+    documents: List[str]
+    metadatas: List[Dict[str, Any]]
+    embeddings: np.ndarray
+    header: Dict[str, Any]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def _pack(strings: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [s.encode("utf-8") for s in strings]
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    offsets = np.cumsum([len(e) for e in encoded], dtype=np.int64)
+    return blob, offsets
+
+
+def _unpack(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    raw = blob.tobytes()
+    out, start = [], 0
+    for end in offsets.tolist():
+        out.append(raw[start:end].decode("utf-8"))
+        start = end
+    return out
+
+
+def _checksum(arrays: Dict[str, np.ndarray]) -> str:
+    h = hashlib.sha256()
+    for name in _COLUMNS:
+        h.update(name.encode())
+        h.update(np.ascontiguousarray(arrays[name]).tobytes())
+    return h.hexdigest()
+
+
+def _read_collection(coll: Any, page: int) -> Tuple[List[str], List[str], List[dict], np.ndarray]:
+    ids: List[str] = []
+    docs: List[str] = []
+    metas: List[dict] = []
+    embs: List[np.ndarray] = []
+    offset = 0
+    while True:
+        res = coll.get(
+            include=["documents", "metadatas", "embeddings"],
+            limit=page,
+            offset=offset,
+        )
+        if not res["ids"]:
+            break
+        ids.extend(res["ids"])
+        docs.extend(d or "" for d in res["documents"])
+        metas.extend(m or {} for m in res["metadatas"])
+        embs.append(np.asarray(res["embeddings"], dtype=np.float32))
+        offset += len(res["ids"])
+    matrix = np.concatenate(embs) if embs else np.zeros((0, 0), dtype=np.float32)
+    return ids, docs, metas, matrix
+
+
+def export_snapshot(coll: Any, path: str, *, page: int = 5000) -> Dict[str, Any]:
+    """Write every entry of ``coll`` to ``path``; returns the snapshot header."""
+    t0 = time.perf_counter()
+    ids, docs, metas, embs = _read_collection(coll, page)
+
+    arrays: Dict[str, np.ndarray] = {"embeddings": embs}
+    arrays["ids_blob"], arrays["ids_off"] = _pack(ids)
+    arrays["documents_blob"], arrays["documents_off"] = _pack(docs)
+    arrays["metadatas_blob"], arrays["metadatas_off"] = _pack(
+        [json.dumps(m, ensure_ascii=False, sort_keys=True) for m in metas]
+    )
+
+    entry_types: Dict[str, int] = {}
+    for m in metas:
+        t = m.get("entry_type") or "legacy"
+        entry_types[t] = entry_types.get(t, 0) + 1
+
+    header = {
+        "format": "portfoliochat-snapshot",
+        "version": FORMAT_VERSION,
+        "created_at": time.time(),
+        "collection": getattr(coll, "name", ""),
+        "count": len(ids),
+        "dim": int(embs.shape[1]) if embs.ndim == 2 and len(embs) else 0,
+        "entry_types": entry_types,
+        "sha256": _checksum(arrays),
+    }
+    arrays["header"] = np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8)
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+    log.info("SNAPSHOT | export | entries=%d | bytes=%d | elapsed=%.2fs",
+             len(ids), os.path.getsize(path), time.perf_counter() - t0)
+    return header
+
+
+def read_snapshot(path: str) -> Snapshot:
+    """Load and verify a snapshot file."""
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+    except (OSError, ValueError, zipfile.BadZipFile) as exc:
+        raise SnapshotError(f"cannot read snapshot {path}: {exc}") from exc
+
+    if "header" not in arrays or any(c not in arrays for c in _COLUMNS):
+        raise SnapshotError("not a snapshot file (missing columns)")
+    header = json.loads(arrays["header"].tobytes().decode("utf-8"))
+    if header.get("format") != "portfoliochat-snapshot" or header.get("version") != FORMAT_VERSION:
+        raise SnapshotError(f"unsupported snapshot version {header.get('version')}")
+    if _checksum(arrays) != header.get("sha256"):
+        raise SnapshotError("checksum mismatch — snapshot is corrupted")
+
+    return Snapshot(
+        ids=_unpack(arrays["ids_blob"], arrays["ids_off"]),
+        documents=_unpack(arrays["documents_blob"], arrays["documents_off"]),
+        metadatas=[json.loads(m) for m in _unpack(arrays["metadatas_blob"], arrays["metadatas_off"])],
+        embeddings=arrays["embeddings"],
+        header=header,
+    )
+
+
+def import_snapshot(
+    coll: Any, snap: Snapshot, *, replace: bool = True, batch: int = 5000,
+    on_written: Optional[Callable[[], None]] = None,
+) -> Dict[str, Any]:
+    """Bulk-load ``snap`` into ``coll`` while it keeps serving.
+
+    The snapshot is written first: ids new to the collection with plain
+    ``add``, ids it already holds with ``upsert`` (several times slower, so
+    only for those). Chunk and question ids carry their document version,
+    which readers only switch to once the version pointers are re-read, so
+    the collection never looks empty or half-restored. ``on_written`` runs
+    at that point (e.g. ``DocVersions.reload``). With ``replace`` the
+    entries missing from the snapshot are deleted last, so the collection
+    then mirrors it exactly; a crash before that leaves extra entries, not
+    missing ones.
+    """
+    t0 = time.perf_counter()
+    existing = set(coll.get(include=[])["ids"])
+
+    overwritten = 0
+    for s in range(0, len(snap), batch):
+        rows = range(s, min(s + batch, len(snap)))
+        for write, pick in ((coll.add, False), (coll.upsert, True)):
+            sel = [i for i in rows if (snap.ids[i] in existing) == pick]
+            if not sel:
+                continue
+            write(
+                ids=[snap.ids[i] for i in sel],
+                documents=[snap.documents[i] for i in sel],
+                metadatas=[snap.metadatas[i] or None for i in sel],
+                embeddings=snap.embeddings[sel],
+            )
+            overwritten += len(sel) if pick else 0
+
+    if on_written is not None:
+        on_written()
+
+    stale = sorted(existing - set(snap.ids)) if replace else []
+    for s in range(0, len(stale), batch):
+        coll.delete(ids=stale[s:s + batch])
+
+    elapsed = time.perf_counter() - t0
+    log.info("SNAPSHOT | import | entries=%d | overwritten=%d | removed=%d | elapsed=%.2fs",
+             len(snap), overwritten, len(stale), elapsed)
+    return {"entries": len(snap), "overwritten": overwritten, "removed": len(stale), "elapsed_s": round(elapsed, 3)}
+
+
+def question_vectors(snap: Snapshot) -> Tuple[List[str], np.ndarray]:
+    """(ids, embeddings) of the question entries, for warm-starting the index."""
+    rows = [i for i, m in enumerate(snap.metadatas) if m.get("entry_type") == "question"]
+    return [snap.ids[i] for i in rows], snap.embeddings[rows]
@@ -0,0 +1,109 @@
+"""Short-lived cache of speculative retrieval results.
+
+``/api/relevance`` already embeds the typed text, blends it with the
+conversation context and queries the nearest questions. It then starts the
+rest of the retrieval (MIN_SIM/MAX_PER_DOC filtering and parent document
+fetch) in the background and stashes the pending result here under a random
+key. When the user submits the same text with the same context (to the
+same tenant),
+``/api/ask/stream`` picks the result up and goes straight to prompting.
+
+Entries are single-use, expire after ``SPECULATION_TTL`` seconds and are
+evicted oldest-first beyond ``SPECULATION_MAX_ENTRIES``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import numpy as np
+
+from backend.utils.constants import SPECULATION_MAX_ENTRIES, SPECULATION_TTL
+
+
+def context_fingerprint(context_embedding: Optional[list[float]]) -> str:
+    """Stable hash of a context embedding (``"none"`` when absent)."""
+    if context_embedding is None:
+        return "none"
+    raw = np.asarray(context_embedding, dtype=np.float32).tobytes()
+    return hashlib.sha256(raw).hexdigest()
+
+
+@dataclass
+class Speculation:
+    text: str
+    context_fp: str
+    blended: list[float]
+    result: asyncio.Future      # resolves to (matched, pairs)
+    created: float
+    tenant: str = ""
+
+
+class SpeculationCache:
+    def __init__(self, ttl: float = SPECULATION_TTL, max_entries: int = SPECULATION_MAX_ENTRIES) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Speculation] = OrderedDict()
+        self.counters = {"stored": 0, "hits": 0, "mismatches": 0, "expired": 0, "misses": 0}
+
+    def put(
+        self,
+        text: str,
+        context_embedding: Optional[list[float]],
+        blended: list[float],
+        result: asyncio.Future,
+        tenant: str = "",
+    ) -> str:
+        key = secrets.token_urlsafe(16)
+        self._entries[key] = Speculation(
+            text=text.strip(),
+            context_fp=context_fingerprint(context_embedding),
+            blended=blended,
+            result=result,
+            created=time.monotonic(),
+            tenant=tenant,
+        )
+        self.counters["stored"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return key
+
+    def discard(self, key: Optional[str]) -> None:
+        if key:
+            self._entries.pop(key, None)
+
+    def take(
+        self,
+        key: Optional[str],
+        text: str,
+        context_embedding: Optional[list[float]],
+        tenant: str = "",
+    ) -> Optional[Speculation]:
+        """Pop the entry for ``key`` if it is fresh and matches the request."""
+        if not key:
+            return None
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+        if time.monotonic() - entry.created > self.ttl:
+            self.counters["expired"] += 1
+            return None
+        if (entry.text != text.strip() or entry.tenant != tenant
+                or entry.context_fp != context_fingerprint(context_embedding)):
+            self.counters["mismatches"] += 1
+            return None
+        self.counters["hits"] += 1
+        return entry
+
+    def stats(self) -> dict[str, Any]:
+        return {"entries": len(self._entries), **self.counters}
+
+
+speculations = SpeculationCache()
@@ -0,0 +1,291 @@
+"""Tenants: one portfolio (collection + persona) per tenant, many per deployment.
+
+Tenants are listed in ``TENANTS_FILE`` (JSON)::
+
+    {"default": "david",
+     "tenants": [
+        {"id": "david", "name": "David Kimhi", "first": "David", "collection": "portfolio_docs"},
+        {"id": "dana",  "name": "Dana Levi",   "first": "Dana"}
+     ]}
+
+``collection`` defaults to ``portfolio_<id>`` and ``system_prompt`` to
+``SECURE_SYSTEM_PROMPT_TEMPLATE`` filled with the persona. Without a file
+there is a single ``default`` tenant on the original ``portfolio_docs``
+collection, so existing deployments keep working unchanged. Requests pick
+a tenant with the ``X-Tenant`` header.
+
+Per-tenant retrieval state — the quantized question index when
+``RETRIEVAL_ENGINE=ivf`` — is loaded on a tenant's first query and kept in
+an LRU: once the loaded indexes' resident bytes exceed
+``TENANT_INDEX_BUDGET`` the least recently used ones are dropped and
+re-loaded on demand. Chroma's own HNSW segments are bounded the same way by
+``CHROMA_MEMORY_LIMIT`` (see backend/utils/settings.py), on by default once
+more than one tenant is configured; the registry counts the loads and
+evictions of Chroma's segment LRU per tenant. Chroma builds whose Rust core
+ignores that limit never evict (a warning is logged at startup): there only
+``RETRIEVAL_ENGINE=ivf`` bounds per-tenant memory.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from backend.utils.bulk_writer import BulkWriter
+from backend.utils.constants import (
+    SECURE_SYSTEM_PROMPT_TEMPLATE, TENANT_INDEX_BUDGET, TENANT_INDEX_RETRY,
+)
+from backend.utils.logger import log
+from backend.utils.settings import (
+    CHROMA_MEMORY_LIMIT, INDEX_DIR, PERSIST_DIR, RETRIEVAL_ENGINE, TENANTS_FILE, chroma,
+)
+from backend.utils.vector_index import QuantizedIndex, catch_up, load_index
+from backend.utils.versions import DocVersions
+
+LEGACY_COLLECTION = "portfolio_docs"
+_init_lock = threading.Lock()
+
+
+@dataclass
+class Tenant:
+    id: str
+    name: str                 # full name, e.g. "David Kimhi"
+    first: str                # how answers refer to the person, e.g. "David"
+    collection: str
+    system_prompt: str
+    index_dir: str
+    _coll: Any = field(default=None, repr=False)
+    _versions: Optional[DocVersions] = field(default=None, repr=False)
+    _writer: Optional[BulkWriter] = field(default=None, repr=False)
+
+    @property
+    def coll(self) -> Any:
+        """The tenant's Chroma collection, opened on first use."""
+        if self._coll is None:
+            self._coll = chroma.get_or_create_collection(self.collection)
+        return self._coll
+
+    @property
+    def versions(self) -> DocVersions:
+        """Published document versions of the tenant's collection."""
+        if self._versions is None:
+            with _init_lock:  # one instance per tenant: it holds the published map
+                if self._versions is None:
+                    self._versions = DocVersions(self.coll)
+        return self._versions
+
+    @property
+    def writer(self) -> BulkWriter:
+        """Batches the ingest writes to the tenant's collection. Event loop only."""
+        if self._writer is None:
+            self._writer = BulkWriter(self.coll)
+        return self._writer
+
+
+def _tenant(raw: Dict[str, Any]) -> Tenant:
+    tid = raw["id"]
+    name = raw.get("name") or tid
+    first = raw.get("first") or name.split()[0]
+    collection = raw.get("collection") or f"portfolio_{tid}"
+    return Tenant(
+        id=tid,
+        name=name,
+        first=first,
+        collection=collection,
+        system_prompt=raw.get("system_prompt") or SECURE_SYSTEM_PROMPT_TEMPLATE.format(name=name, first=first),
+        # The original collection keeps its original index location
+        index_dir=raw.get("index_dir") or (INDEX_DIR if collection == LEGACY_COLLECTION else f"{INDEX_DIR}-{tid}"),
+    )
+
+
+def load_tenants(path: Optional[str]) -> tuple[Dict[str, Tenant], str]:
+    """(tenants by id, default tenant id) from ``path``, or the single legacy tenant."""
+    if not path:
+        legacy = _tenant({"id": "default", "name": "David Kimhi", "first": "David", "collection": LEGACY_COLLECTION})
+        return {legacy.id: legacy}, legacy.id
+    with open(path, encoding="utf-8") as f:
+        cfg = json.load(f)
+    tenants = {t.id: t for t in map(_tenant, cfg["tenants"])}
+    if not tenants:
+        raise ValueError(f"{path}: no tenants configured")
+    default = cfg.get("default") or next(iter(tenants))
+    if default not in tenants:
+        raise ValueError(f"{path}: default tenant {default!r} is not configured")
+    return tenants, default
+
+
+def _chroma_lru() -> Optional[Any]:
+    """Chroma's vector segment LRU, if this Chroma build enforces CHROMA_MEMORY_LIMIT."""
+    manager = getattr(getattr(chroma, "_server", None), "_manager", None)
+    for scope, cache in (getattr(manager, "segment_cache", None) or {}).items():
+        if getattr(scope, "value", scope) == "VECTOR" and hasattr(cache, "capacity"):
+            return cache
+    return None
+
+
+def _segment_bytes(coll: Any) -> int:
+    """On-disk (≈ resident, once loaded) size of a collection's HNSW segment."""
+    db = sqlite3.connect(f"file:{os.path.join(PERSIST_DIR, 'chroma.sqlite3')}?mode=ro", uri=True)
+    try:
+        rows = db.execute(
+            "SELECT id FROM segments WHERE collection = ? AND scope = 'VECTOR'", (str(coll.id),)
+        ).fetchall()
+    finally:
+        db.close()
+    total = 0
+    for (seg_id,) in rows:
+        for root, _, files in os.walk(os.path.join(PERSIST_DIR, seg_id)):
+            total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+
+class TenantRegistry:
+    """Tenant lookup plus an LRU of loaded per-tenant question indexes."""
+
+    def __init__(self, tenants: Dict[str, Tenant], default: str, budget: int = TENANT_INDEX_BUDGET) -> None:
+        self._tenants = tenants
+        self.default = default
+        self.budget = budget
+        self._indexes: "OrderedDict[str, QuantizedIndex]" = OrderedDict()
+        self._missing: Dict[str, float] = {}  # tenant → when its index was last found missing
+        self._lock = threading.Lock()
+        self._load_locks = {tid: threading.Lock() for tid in tenants}
+        self.counters: Dict[str, Dict[str, int]] = {
+            tid: {"hits": 0, "loads": 0, "evictions": 0, "chroma_loads": 0, "chroma_evictions": 0}
+            for tid in tenants
+        }
+        self._chroma_lru = _chroma_lru()
+        if self._chroma_lru is not None:
+            self._watch_chroma(self._chroma_lru)
+        elif CHROMA_MEMORY_LIMIT and RETRIEVAL_ENGINE != "ivf":
+            log.warning("TENANTS | this Chroma build ignores CHROMA_MEMORY_LIMIT: HNSW segments of every "
+                        "queried tenant stay loaded (RETRIEVAL_ENGINE=ivf bounds them by TENANT_INDEX_BUDGET)")
+
+    def _watch_chroma(self, lru: Any) -> None:
+        # Chroma's LRU keys segments by collection id: count per tenant what it loads and evicts
+        set_segment, evicted = lru.set, lru.callback
+
+        def _set(key: Any, value: Any) -> None:
+            if key not in lru.cache:
+                self._chroma_event(key, "chroma_loads")
+            set_segment(key, value)
+
+        def _evicted(key: Any, value: Any) -> Any:
+            self._chroma_event(key, "chroma_evictions")
+            return evicted(key, value)
+
+        lru.set, lru.callback = _set, _evicted
+
+    def _chroma_event(self, coll_id: Any, counter: str) -> None:
+        for tid, t in self._tenants.items():
+            if t._coll is not None and str(t._coll.id) == str(coll_id):
+                self.counters[tid][counter] += 1
+                if counter == "chroma_evictions":
+                    log.info("TENANTS | chroma evicted segment | tenant=%s", tid)
+                return
+
+    def _chroma_resident(self, t: Tenant) -> bool:
+        if t._coll is None:
+            return False
+        if self._chroma_lru is None:
+            return True  # opened, and this Chroma build never unloads it
+        return t._coll.id in self._chroma_lru.cache
+
+    def get(self, tenant_id: Optional[str] = None) -> Tenant:
+        """The tenant for ``tenant_id`` (default tenant if empty); KeyError if unknown."""
+        return self._tenants[tenant_id or self.default]
+
+    def __iter__(self):
+        return iter(self._tenants.values())
+
+    def index(self, tenant: Tenant) -> Optional[QuantizedIndex]:
+        """The tenant's quantized index, loading it on first use. Blocking."""
+        if RETRIEVAL_ENGINE != "ivf":
+            return None
+        with self._lock:
+            idx = self._indexes.get(tenant.id)
+            if idx is not None:
+                self._indexes.move_to_end(tenant.id)
+                self.counters[tenant.id]["hits"] += 1
+                return idx
+        with self._load_locks[tenant.id]:
+            with self._lock:
+                if tenant.id in self._indexes:  # loaded by a concurrent request
+                    return self._indexes[tenant.id]
+                if time.monotonic() - self._missing.get(tenant.id, -TENANT_INDEX_RETRY) < TENANT_INDEX_RETRY:
+                    return None
+            idx = load_index(tenant.index_dir)
+            if idx is None:
+                self._missing[tenant.id] = time.monotonic()
+                return None
+            catch_up(idx, tenant.coll)  # versions published since the export
+            self.set_index(tenant, idx)
+            return idx
+
+    def loaded_index(self, tenant: Tenant) -> Optional[QuantizedIndex]:
+        """The tenant's index if it is in memory right now (never loads it)."""
+        with self._lock:
+            return self._indexes.get(tenant.id)
+
+    def set_index(self, tenant: Tenant, idx: Optional[QuantizedIndex]) -> None:
+        """Install a freshly built index (or drop it with None)."""
+        with self._lock:
+            self._indexes.pop(tenant.id, None)
+            self._missing.pop(tenant.id, None)
+            if idx is None:
+                return
+            self._indexes[tenant.id] = idx
+            self.counters[tenant.id]["loads"] += 1
+            self._evict(keep=tenant.id)
+
+    def _evict(self, keep: str) -> None:
+        total = sum(i.resident_bytes() for i in self._indexes.values())
+        while total > self.budget and len(self._indexes) > 1:
+            victim = next(iter(self._indexes))
+            if victim == keep:
+                self._indexes.move_to_end(keep)
+                continue
+            total -= self._indexes.pop(victim).resident_bytes()
+            self.counters[victim]["evictions"] += 1
+            log.info("TENANTS | evicted index | tenant=%s | resident_total=%d", victim, total)
+
+    def stats(self) -> Dict[str, Any]:
+        """Registry state. Blocking: sizes Chroma segments on disk."""
+        chroma_bytes = {
+            tid: _segment_bytes(t._coll) for tid, t in self._tenants.items() if self._chroma_resident(t)
+        }
+        with self._lock:
+            loaded = {tid: idx.resident_bytes() for tid, idx in self._indexes.items()}
+            return {
+                "engine": RETRIEVAL_ENGINE,
+                "default": self.default,
+                "budget_bytes": self.budget,
+                "resident_bytes": sum(loaded.values()),
+                "chroma": {
+                    "memory_limit_bytes": CHROMA_MEMORY_LIMIT,
+                    "evicting": self._chroma_lru is not None,
+                    "resident_bytes": sum(chroma_bytes.values()),
+                },
+                "tenants": {
+                    tid: {
+                        "collection": t.collection,
+                        "loaded": tid in loaded,
+                        "resident_bytes": loaded.get(tid, 0),
+                        "chroma_loaded": tid in chroma_bytes,
+                        "chroma_resident_bytes": chroma_bytes.get(tid, 0),
+                        **self.counters[tid],
+                        "versions": t._versions.stats() if t._versions else None,
+                        "writes": t._writer.stats() if t._writer else None,
+                    }
+                    for tid, t in self._tenants.items()
+                },
+            }
+
+
+tenants = TenantRegistry(*load_tenants(TENANTS_FILE))
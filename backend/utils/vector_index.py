@@ -0,0 +1,325 @@
+"""Quantized approximate index over question embeddings (IVF + int8).
+
+An alternative to Chroma's HNSW for very large question sets:
+
+* **IVF coarse partition** — spherical k-means centroids; each query only
+  scans the ``nprobe`` closest lists.
+* **int8 codes** — every vector is scalar-quantized per dimension and stored
+  in a memory-mapped ``codes.npy``, sorted by list so a list is one
+  contiguous slice. Approximate scores are ``codes · (q * scale)``.
+* **Exact re-ranking** — the best ``rerank`` candidates are re-scored with the
+  float vectors from a second memory-mapped file, so final similarities are
+  exact and MIN_SIM keeps its meaning.
+
+Only ids and centroids stay resident; codes and floats are paged in by the
+OS on demand. The index holds no text or metadata — callers fetch
+those for the final hits from Chroma, which also drops ids deleted since the
+last build.
+
+Questions written after the build (ingest, updates) are added to an
+in-memory *delta* with :meth:`QuantizedIndex.add`: float vectors searched
+exactly next to the IVF lists, shadowing any built row with the same id.
+The delta only costs RAM and a linear scan, so once it holds
+``IVF_DELTA_REBUILD`` rows the service rebuilds the index in the background.
+An index loaded from disk catches up with :func:`catch_up`: question rows
+of document versions stamped after the export (see
+backend/utils/versions.py) are read from Chroma into its delta.
+
+Enabled with ``RETRIEVAL_ENGINE=ivf``; built by
+``python -m backend.tools.build_index`` or ``POST /api/admin/index/rebuild``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.utils.constants import IVF_CATCHUP_MARGIN, IVF_NPROBE, IVF_RERANK
+from backend.utils.logger import log
+
+FORMAT_VERSION = 1
+
+
+def _assign(vecs: np.ndarray, centroids: np.ndarray, batch: int = 65536) -> np.ndarray:
+    out = np.empty(len(vecs), dtype=np.int64)
+    for s in range(0, len(vecs), batch):
+        out[s:s + batch] = np.argmax(vecs[s:s + batch] @ centroids.T, axis=1)
+    return out
+
+
+def _kmeans(vecs: np.ndarray, nlist: int, iters: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means (cosine) — returns unit-length centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vecs[rng.choice(len(vecs), size=nlist, replace=False)].copy()
+    for _ in range(iters):
+        assign = _assign(vecs, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vecs)
+        empty = np.bincount(assign, minlength=nlist) == 0
+        sums[empty] = vecs[rng.integers(len(vecs), size=int(empty.sum()))]
+        centroids = sums
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids.astype(np.float32)
+
+
+def build_index(
+    path: str,
+    ids: List[str],
+    vecs: np.ndarray,
+    *,
+    nlist: Optional[int] = None,
+    train_sample: int = 50_000,
+    exported_at: Optional[float] = None,
+) -> None:
+    """Write an IVF/int8 index for unit-length ``vecs`` into directory ``path``.
+
+    ``exported_at`` is when ``vecs`` were read from the collection (default:
+    now); rows written after it are caught up on load. The index is written
+    next to ``path`` and swapped in with renames, so a reader never sees a
+    half-written directory.
+    """
+    if exported_at is None:
+        exported_at = time.time()
+    vecs = np.ascontiguousarray(vecs, dtype=np.float32)
+    n, dim = vecs.shape
+    if nlist is None:
+        nlist = int(max(1, min(4096, 4 * np.sqrt(n))))
+    nlist = max(1, min(nlist, n))
+
+    rng = np.random.default_rng(0)
+    sample = vecs if n <= train_sample else vecs[rng.choice(n, size=train_sample, replace=False)]
+    centroids = _kmeans(sample, nlist)
+
+    assign = _assign(vecs, centroids)
+    order = np.argsort(assign, kind="stable")
+    counts = np.bincount(assign, minlength=nlist)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    sorted_vecs = vecs[order]
+    scale = np.maximum(np.abs(sorted_vecs).max(axis=0), 1e-6) / 127.0
+    codes = np.clip(np.rint(sorted_vecs / scale), -127, 127).astype(np.int8)
+
+    tmp = f"{path}.building"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "centroids.npy"), centroids)
+    np.save(os.path.join(tmp, "offsets.npy"), offsets)
+    np.save(os.path.join(tmp, "scale.npy"), scale.astype(np.float32))
+    np.save(os.path.join(tmp, "codes.npy"), codes)
+    np.save(os.path.join(tmp, "vectors.npy"), sorted_vecs)
+    with open(os.path.join(tmp, "ids.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": FORMAT_VERSION,
+            "built_at": time.time(),
+            "exported_at": exported_at,
+            "ids": [ids[i] for i in order],
+        }, f)
+
+    old = f"{path}.old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(path):
+        os.rename(path, old)
+    os.rename(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+    log.info("INDEX | built | n=%d | dim=%d | nlist=%d | path=%s", n, dim, nlist, path)
+
+
+class QuantizedIndex:
+    """Read side of an index written by :func:`build_index`."""
+
+    def __init__(self, path: str) -> None:
+        with open(os.path.join(path, "ids.json"), encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"unsupported index version {header.get('version')}")
+        self.path = path
+        self.built_at: float = header["built_at"]
+        self.exported_at: float = header.get("exported_at", self.built_at)
+        self.ids: List[str] = header["ids"]
+        self.centroids = np.load(os.path.join(path, "centroids.npy"))
+        self.offsets = np.load(os.path.join(path, "offsets.npy"))
+        self.scale = np.load(os.path.join(path, "scale.npy"))
+        self.codes = np.load(os.path.join(path, "codes.npy"), mmap_mode="r")
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.base_size = len(self.ids)
+        # Rows added since the build: (buffer, rows in use). Rows are written
+        # past the published count first and the pair is swapped after, so
+        # searches in other threads never see a half-applied add
+        self._delta: Tuple[np.ndarray, int] = (np.zeros((0, self.centroids.shape[1]), dtype=np.float32), 0)
+        self._delta_ids: set[str] = set()
+        self._add_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def delta_size(self) -> int:
+        return self._delta[1]
+
+    def in_delta(self, qid: str) -> bool:
+        return qid in self._delta_ids
+
+    def add(self, ids: List[str], vecs: Any) -> None:
+        """Make rows written after the build searchable (unit-length ``vecs``)."""
+        if not ids:
+            return
+        vecs = np.asarray(vecs, dtype=np.float32).reshape(len(ids), -1)
+        with self._add_lock:
+            buf, n = self._delta
+            need = n + len(ids)
+            if need > len(buf):  # grow geometrically: amortized O(1) per row
+                grown = np.zeros((max(need, 2 * len(buf), 64), buf.shape[1]), dtype=np.float32)
+                grown[:n] = buf[:n]
+                buf = grown
+            buf[n:need] = vecs
+            self.ids.extend(ids)  # rows exist before the published count covers them
+            self._delta = (buf, need)
+            self._delta_ids.update(ids)
+
+    def search(
+        self,
+        query: Iterable[float],
+        k: int,
+        *,
+        nprobe: int = IVF_NPROBE,
+        rerank: int = IVF_RERANK,
+    ) -> List[Tuple[int, float]]:
+        """Top-``k`` rows as ``(row, cosine_similarity)``, best first."""
+        q = np.asarray(query, dtype=np.float32)
+        buf, n = self._delta
+        if not n:
+            return self._search_built(q, k, nprobe, rerank)
+        # Over-fetch a little: built rows re-added to the delta are skipped
+        hits = self._search_built(q, k + min(k, n), nprobe, rerank)
+        hits = [(row, sim) for row, sim in hits if self.ids[row] not in self._delta_ids]
+        sims = buf[:n] @ q
+        top = np.argpartition(-sims, k - 1)[:k] if k < len(sims) else np.arange(len(sims))
+        hits.extend((self.base_size + int(i), float(sims[i])) for i in top)
+        return sorted(hits, key=lambda h: -h[1])[:k]
+
+    def _search_built(self, q: np.ndarray, k: int, nprobe: int, rerank: int) -> List[Tuple[int, float]]:
+        nlist = len(self.centroids)
+        nprobe = max(1, min(nprobe, nlist))
+        csim = self.centroids @ q
+        lists = np.argpartition(-csim, nprobe - 1)[:nprobe] if nprobe < nlist else np.arange(nlist)
+
+        qs = q * self.scale
+        rows_parts, score_parts = [], []
+        for c in lists:
+            start, end = int(self.offsets[c]), int(self.offsets[c + 1])
+            if end > start:
+                rows_parts.append(np.arange(start, end))
+                score_parts.append(self.codes[start:end].astype(np.float32) @ qs)
+        if not rows_parts:
+            return []
+        rows = np.concatenate(rows_parts)
+        approx = np.concatenate(score_parts)
+
+        keep = min(len(rows), max(k, rerank))
+        top = np.argpartition(-approx, keep - 1)[:keep] if keep < len(rows) else np.arange(len(rows))
+        cand = np.sort(rows[top])  # ascending rows → sequential reads from the memmap
+        exact = self.vectors[cand] @ q
+        best = np.argsort(-exact)[:k]
+        return [(int(cand[i]), float(exact[i])) for i in best]
+
+    def resident_bytes(self) -> int:
+        """Approximate RAM that stays resident (excludes memory-mapped pages)."""
+        strings = sum(len(s) + 49 for s in self.ids)  # CPython str overhead ≈ 49 bytes
+        return int(self.centroids.nbytes + self.offsets.nbytes + self.scale.nbytes + self._delta[0].nbytes + strings)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "path": self.path,
+            "size": len(self),
+            "delta": self.delta_size,
+            "lists": len(self.centroids),
+            "built_at": self.built_at,
+            "resident_bytes": self.resident_bytes(),
+            "mapped_bytes": int(self.codes.nbytes + self.vectors.nbytes),
+        }
+
+
+def load_index(path: str) -> Optional[QuantizedIndex]:
+    """Open the index at ``path``; None (with a warning) if missing or unreadable."""
+    if not os.path.isdir(path):
+        log.warning("INDEX | no index at %s — falling back to Chroma", path)
+        return None
+    try:
+        idx = QuantizedIndex(path)
+    except Exception as exc:
+        log.error("INDEX | load failed | path=%s | err=%s", path, exc)
+        return None
+    log.info("INDEX | loaded | n=%d | lists=%d", len(idx), len(idx.centroids))
+    return idx
+
+
+def export_question_vectors(coll: Any, page: int = 5000) -> Tuple[List[str], np.ndarray]:
+    """Page every question entry out of a Chroma collection: (ids, vecs)."""
+    ids: List[str] = []
+    chunks: List[np.ndarray] = []
+    offset = 0
+    while True:
+        res = coll.get(
+            where={"entry_type": "question"},
+            include=["embeddings"],
+            limit=page,
+            offset=offset,
+        )
+        if not res["ids"]:
+            break
+        ids.extend(res["ids"])
+        chunks.append(np.asarray(res["embeddings"], dtype=np.float32))
+        offset += len(res["ids"])
+    vecs = np.concatenate(chunks) if chunks else np.zeros((0, 0), dtype=np.float32)
+    return ids, vecs
+
+
+def catch_up(idx: QuantizedIndex, coll: Any, margin: float = IVF_CATCHUP_MARGIN, page: int = 5000) -> int:
+    """Add the questions of versions written since ``idx`` was exported to its delta.
+
+    Versions are millisecond timestamps taken when a document's build
+    starts, so the last ``margin`` seconds before the export are read too;
+    rows the index already holds are then shadowed by identical delta rows.
+    Entries without a version predate versioning and are always built in.
+    """
+    since = int((idx.exported_at - margin) * 1000)
+    added = 0
+    offset = 0
+    while True:
+        res = coll.get(
+            where={"$and": [{"entry_type": "question"}, {"version": {"$gt": since}}]},
+            include=["embeddings"],
+            limit=page,
+            offset=offset,
+        )
+        if not res["ids"]:
+            break
+        offset += len(res["ids"])
+        rows = [i for i, qid in enumerate(res["ids"]) if not idx.in_delta(qid)]
+        if rows:
+            vecs = np.asarray(res["embeddings"], dtype=np.float32)[rows]
+            idx.add([res["ids"][i] for i in rows], vecs)
+            added += len(rows)
+    if added:
+        log.info("INDEX | caught_up | added=%d | path=%s", added, idx.path)
+    return added
+
+
+def rebuild_from_collection(coll: Any, path: str) -> Optional[QuantizedIndex]:
+    """Build the index from every question in ``coll`` and load it, caught up."""
+    exported_at = time.time()
+    ids, vecs = export_question_vectors(coll)
+    if not ids:
+        log.warning("INDEX | no question entries to index")
+        return None
+    build_index(path, ids, vecs, exported_at=exported_at)
+    idx = load_index(path)
+    if idx is not None:
+        catch_up(idx, coll)  # written while the index was being built
+    return idx
@@ -0,0 +1,169 @@
+"""Copy-on-write document versions.
+
+Every chunk and question of a document carries a ``version`` metadata
+field. An ingest or update writes the new version's entries next to the old
+ones — which stay visible meanwhile — and then publishes it: one pointer
+entry per document (``entry_type="version"``) is upserted and the in-memory
+``parent_id → version`` map is replaced by a new one. Readers take the
+current map once per retrieval, a plain attribute read with no lock, and
+ignore entries whose version is not the one their map names. A query
+therefore sees either the old version or the new one, never a mix, and
+never a document whose questions are not written yet.
+
+Superseded entries are deleted once no reader can still need them: each map
+keeps a reference to its successor, so maps are freed oldest first, and a
+weakref finalizer on the replaced map queues its superseded versions for
+deletion when the last reader holding it (or an older map) lets go.
+
+Entries written before versioning have no ``version`` field and count as
+version 0; documents without a pointer entry are live at version 0.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple
+
+from backend.utils.logger import log
+
+VERSION_ENTRY = "version"   # entry_type of the per-document pointer entries
+
+
+class VersionMap(dict):
+    """``parent_id → live version``; never modified once published."""
+
+    __slots__ = ("_next", "__weakref__")
+
+
+def entry_version(meta: Dict[str, Any]) -> int:
+    return int(meta.get("version", 0))
+
+
+class DocVersions:
+    """Live document versions of one collection."""
+
+    def __init__(self, coll: Any) -> None:
+        self.coll = coll
+        self._current: Optional[VersionMap] = None
+        self._lock = threading.Lock()        # writers only
+        self._retired: Deque[Tuple[str, int]] = deque()
+        self.counters = {"published": 0, "retired": 0, "collected_entries": 0, "dropped_entries": 0}
+
+    @property
+    def current(self) -> VersionMap:
+        """The published map. Hold on to it for the whole read."""
+        view = self._current
+        return view if view is not None else self._load()
+
+    def _load(self) -> VersionMap:
+        with self._lock:
+            if self._current is None:
+                res = self.coll.get(where={"entry_type": VERSION_ENTRY}, include=["metadatas"])
+                self._current = VersionMap({m["parent_id"]: int(m["version"]) for m in res["metadatas"]})
+            return self._current
+
+    @staticmethod
+    def is_live(view: VersionMap, meta: Dict[str, Any]) -> bool:
+        return entry_version(meta) == view.get(meta.get("parent_id", ""), 0)
+
+    def next_version(self, parent_id: str) -> int:
+        """A fresh version number for ``parent_id`` (milliseconds, strictly increasing)."""
+        return max(int(time.time() * 1000), self.current.get(parent_id, 0) + 1)
+
+    def _stored_versions(self, parent_id: str) -> Dict[int, list[str]]:
+        res = self.coll.get(where={"parent_id": parent_id}, include=["metadatas"])
+        out: Dict[int, list[str]] = {}
+        for eid, meta in zip(res["ids"], res["metadatas"]):
+            if meta.get("entry_type") != VERSION_ENTRY:
+                out.setdefault(entry_version(meta), []).append(eid)
+        return out
+
+    def publish(self, parent_id: str, version: int, embedding: list[float]) -> None:
+        """Make ``version`` the live version of ``parent_id``. Blocking.
+
+        ``embedding`` only fills the pointer entry's vector slot (Chroma
+        requires one); pointer entries are never returned by queries.
+        """
+        stale = {v for v in self._stored_versions(parent_id) if v < version}
+        if parent_id not in self.current:
+            stale.add(0)  # may be a pre-chunking entry stored under the plain id
+        self.coll.upsert(
+            ids=[f"{parent_id}__version"],
+            embeddings=[embedding],
+            metadatas=[{"parent_id": parent_id, "entry_type": VERSION_ENTRY, "version": version}],
+        )
+        if self._current is None:
+            self._load()
+        with self._lock:
+            old = self._current
+            new = VersionMap(old)
+            new[parent_id] = version
+            old._next = new
+            self._current = new
+            self.counters["published"] += 1
+            if stale:
+                weakref.finalize(old, self._retire, [(parent_id, v) for v in stale]).atexit = False
+        del old
+
+    def discard(self, parent_id: str) -> None:
+        """Forget a deleted document (its entries are removed by the caller)."""
+        if self._current is None:
+            self._load()
+        with self._lock:
+            if parent_id in self._current:
+                new = VersionMap(self._current)
+                del new[parent_id]
+                self._current._next = new
+                self._current = new
+
+    def drop(self, parent_id: str, version: int) -> None:
+        """Delete the entries of an unpublished version (a failed build). Blocking."""
+        ids = self._stored_versions(parent_id).get(version, [])
+        if ids:
+            self.coll.delete(ids=ids)
+            self.counters["dropped_entries"] += len(ids)
+
+    def reload(self) -> None:
+        """Re-read the pointers after the collection was replaced (snapshot restore)."""
+        with self._lock:
+            self._current = None
+
+    def _retire(self, pairs: Iterable[Tuple[str, int]]) -> None:
+        # Runs in whichever thread released the last reference — hand the
+        # deletes to a thread of their own instead of delaying that reader
+        self._retired.extend(pairs)
+        threading.Thread(target=self.collect, name="version-gc", daemon=True).start()
+
+    def collect(self) -> int:
+        """Delete every retired version nothing can read any more. Blocking."""
+        by_doc: Dict[str, set[int]] = {}
+        while self._retired:
+            try:
+                pid, version = self._retired.popleft()
+            except IndexError:
+                break
+            by_doc.setdefault(pid, set()).add(version)
+
+        removed = 0
+        for pid, versions in by_doc.items():
+            versions.discard(self.current.get(pid, -1))  # never the live one
+            stored = self._stored_versions(pid)
+            ids = [eid for v in versions for eid in stored.get(v, [])]
+            if 0 in versions:
+                ids += self.coll.get(ids=[pid], include=[])["ids"]  # pre-chunking entry under the plain id
+            if ids:
+                try:
+                    self.coll.delete(ids=ids)
+                except Exception as exc:
+                    log.warning("VERSIONS | gc_failed | doc=%s | err=%s", pid, exc)
+                    continue
+                removed += len(ids)
+            self.counters["retired"] += len(versions)
+        self.counters["collected_entries"] += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        return {"docs": len(self.current), "gc_pending": len(self._retired), **self.counters}
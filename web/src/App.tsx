@@ -24,6 +24,9 @@ export default function App() {
   // Conversation context — the blended embedding returned by the backend
   const contextEmbeddingRef = useRef<number[] | null>(null);
 
+  // Speculative retrieval key from the last /api/relevance call (and the text it was for)
+  const speculationRef = useRef<{ text: string; key: string } | null>(null);
+
   // Load saved JWT from sessionStorage on first render
   useEffect(() => {
     setJwt(getStoredJwt());
@@ -53,12 +56,16 @@ export default function App() {
       let full = "";
       let sources: Record<string, unknown>[] = [];
 
+      const spec = speculationRef.current;
+      speculationRef.current = null;
+
       try {
         for await (const ev of streamNdjson(
           "/api/ask/stream",
           {
             question: q,
             context_embedding: contextEmbeddingRef.current,
+            speculation_key: spec?.text === q ? spec.key : null,
           },
           jwt,
         )) {
@@ -162,6 +169,7 @@ export default function App() {
           onTranslate={handleTranslate}
           translatingIndex={translatingIndex}
           contextEmbeddingRef={contextEmbeddingRef}
+          speculationRef={speculationRef}
         />
       </main>
       {/* Slide-in admin panel for login + document ingestion */}
@@ -14,6 +14,12 @@ export function apiUrl(path: string): string {
   return base ? `${base}${p}` : p;
 }
 
+// Portfolio this build talks to, sent as X-Tenant (VITE_TENANT; empty → the server's default)
+function tenantHeaders(): Record<string, string> {
+  const tenant = import.meta.env.VITE_TENANT?.trim();
+  return tenant ? { "X-Tenant": tenant } : {};
+}
+
 export function getStoredJwt(): string | null {
   try {
     return sessionStorage.getItem(JWT_KEY);
@@ -57,6 +63,7 @@ export async function* streamNdjson(
   const headers: Record<string, string> = {
     "Content-Type": "application/json",
     Accept: "application/x-ndjson, application/json",
+    ...tenantHeaders(),
   };
   if (token) headers.Authorization = `Bearer ${token}`;
 
@@ -140,7 +147,7 @@ export type DocItem = {
 // GET /api/docs → returns all stored documents (requires JWT)
 export async function listDocs(token: string): Promise<DocItem[]> {
   const res = await fetch(apiUrl("/api/docs"), {
-    headers: { Authorization: `Bearer ${token}` },
+    headers: { Authorization: `Bearer ${token}`, ...tenantHeaders() },
   });
   if (!res.ok) throw new Error(`List docs failed: ${res.status}`);
   const data = (await res.json()) as { docs: DocItem[] };
@@ -151,50 +158,98 @@ export async function listDocs(token: string): Promise<DocItem[]> {
 export async function deleteDoc(id: string, token: string): Promise<void> {
   const res = await fetch(apiUrl(`/api/docs/${encodeURIComponent(id)}`), {
     method: "DELETE",
-    headers: { Authorization: `Bearer ${token}` },
+    headers: { Authorization: `Bearer ${token}`, ...tenantHeaders() },
   });
   if (!res.ok) throw new Error(`Delete failed: ${res.status}`);
 }
 
-// PUT /api/docs/{id} → re-embeds and updates a document (requires JWT)
+// PUT /api/docs/{id} → queues a re-embed job for the document (requires JWT); returns the job id
 export async function updateDoc(
   id: string,
   text: string,
   meta: Record<string, string>,
   token: string,
   header?: string,
-): Promise<void> {
+): Promise<string> {
   const res = await fetch(apiUrl(`/api/docs/${encodeURIComponent(id)}`), {
     method: "PUT",
     headers: {
       "Content-Type": "application/json",
       Authorization: `Bearer ${token}`,
+      ...tenantHeaders(),
     },
     body: JSON.stringify({ text, meta, header: header ?? "" }),
   });
   if (!res.ok) throw new Error(`Update failed: ${res.status}`);
+  const data = (await res.json()) as { job_id: string };
+  return data.job_id;
 }
 
-// POST /api/ingest → sends documents to be embedded and stored in ChromaDB (requires JWT)
+// POST /api/ingest → queues documents to be embedded and stored in ChromaDB (requires JWT); returns the job id
 export async function ingestRequest(
   items: { id: string; text: string; header?: string; meta: Record<string, string> }[],
   token: string,
-): Promise<void> {
+): Promise<string> {
   const res = await fetch(apiUrl("/api/ingest"), {
     method: "POST",
     headers: {
       "Content-Type": "application/json",
       Authorization: `Bearer ${token}`,
+      ...tenantHeaders(),
     },
     body: JSON.stringify(items),
   });
   if (!res.ok) throw new Error(`Ingest failed: ${res.status}`);
+  const data = (await res.json()) as { job_id: string };
+  return data.job_id;
 }
 
-// POST /api/relevance → returns { score, context_embedding } without a GPT call
+// Shape of an ingest/update job returned by GET /api/jobs/{id}
+export type JobStatus = {
+  id: string;
+  kind: "ingest" | "update";
+  status: "queued" | "running" | "retrying" | "done" | "failed";
+  error: string | null;
+  progress: { done: number; failed: number; total: number };
+  docs: { doc_id: string; stage: string; error: string | null }[];
+};
+
+// GET /api/jobs/{id}/stream → follows a job until it finishes; throws if it failed
+export async function waitForJob(
+  jobId: string,
+  token: string,
+  onProgress?: (job: JobStatus) => void,
+): Promise<JobStatus> {
+  const res = await fetch(apiUrl(`/api/jobs/${encodeURIComponent(jobId)}/stream`), {
+    headers: { Authorization: `Bearer ${token}`, Accept: "application/x-ndjson" },
+  });
+  if (!res.ok || !res.body) throw new Error(`Job status failed: ${res.status}`);
+
+  const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  let last: JobStatus | null = null;
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += value;
+    const lines = buffer.split("\n");
+    buffer = lines.pop() ?? "";
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      last = JSON.parse(line) as JobStatus;
+      onProgress?.(last);
+    }
+  }
+  if (!last || last.status !== "done") throw new Error(last?.error ?? "Job did not finish");
+  return last;
+}
+
+// POST /api/relevance → returns { score, context_embedding, speculation_key } without a GPT call
 export type RelevanceResult = {
   score: number;
   context_embedding: number[] | null;
+  // Key of the speculative retrieval started for this text; pass it to /api/ask/stream
+  speculation_key?: string;
 };
 
 export async function fetchRelevance(
@@ -203,7 +258,7 @@ export async function fetchRelevance(
 ): Promise<RelevanceResult> {
   const res = await fetch(apiUrl("/api/relevance"), {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
+    headers: { "Content-Type": "application/json", ...tenantHeaders() },
     body: JSON.stringify({
       text,
       context_embedding: contextEmbedding ?? null,
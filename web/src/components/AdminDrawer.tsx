@@ -8,7 +8,9 @@ import {
   listDocs,
   deleteDoc,
   updateDoc,
+  waitForJob,
   type DocItem,
+  type JobStatus,
 } from "../api/client";
 import "./AdminDrawer.css";
 
@@ -74,6 +76,11 @@ export function AdminDrawer({
 
   // ── Handlers ──────────────────────────────────────────────
 
+  // Ingest and update run as background jobs — show progress until done
+  const showProgress = (job: JobStatus) => {
+    setNotice(`${t("processing", lang)} ${job.progress.done}/${job.progress.total}`);
+  };
+
   const handleLogin = async (e: React.FormEvent) => {
     e.preventDefault();
     setError(null);
@@ -107,10 +114,11 @@ export function AdminDrawer({
     setNotice(null);
     const title = docTitle.trim() || t("untitled", lang);
     try {
-      await ingestRequest(
+      const jobId = await ingestRequest(
         [{ id: title, text, header: docHeader.trim(), meta: { title, url: sourceUrl.trim() } }],
         jwt,
       );
+      await waitForJob(jobId, jwt, showProgress);
       setNotice(t("ingested", lang));
       setPasteText("");
       setDocTitle("");
@@ -154,7 +162,8 @@ export function AdminDrawer({
     if (!text) return;
     setError(null);
     try {
-      await updateDoc(id, text, { title: id, url: editUrl.trim() }, jwt, editHeader.trim());
+      const jobId = await updateDoc(id, text, { title: id, url: editUrl.trim() }, jwt, editHeader.trim());
+      await waitForJob(jobId, jwt, showProgress);
       setNotice(t("updated", lang));
       setExpandedId(null);
       await fetchDocs(); // refresh list with updated content
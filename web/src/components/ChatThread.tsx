@@ -20,6 +20,7 @@ type Props = {
   onTranslate: (messageIndex: number) => void;
   translatingIndex: number | null;
   contextEmbeddingRef: MutableRefObject<number[] | null>;
+  speculationRef: MutableRefObject<{ text: string; key: string } | null>;
 };
 
 export function ChatThread({
@@ -30,6 +31,7 @@ export function ChatThread({
   onTranslate,
   translatingIndex,
   contextEmbeddingRef,
+  speculationRef,
 }: Props) {
   const bottomRef = useRef<HTMLDivElement>(null);
   const [input, setInput] = useState("");
@@ -52,16 +54,18 @@ export function ChatThread({
       fetchRelevance(text, contextEmbeddingRef.current)
         .then((r) => {
           setRelevanceScore(r.score);
-          if (r.context_embedding) {
-            contextEmbeddingRef.current = r.context_embedding;
-          }
+          // Keep the context untouched so the submitted question matches the
+          // speculative retrieval the backend started for this exact text
+          speculationRef.current = r.speculation_key
+            ? { text, key: r.speculation_key }
+            : null;
         })
         .catch(() => setRelevanceScore(null));
     }, 300);
     return () => {
       if (debounceRef.current) clearTimeout(debounceRef.current);
     };
-  }, [input, contextEmbeddingRef]);
+  }, [input, contextEmbeddingRef, speculationRef]);
 
   const presets = PRESET_QUESTIONS[lang];
   const lastIdx = messages.length - 1;
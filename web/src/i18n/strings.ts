@@ -71,6 +71,10 @@ const STRINGS: Record<string, Record<Lang, string>> = {
     en: "Ingest failed",
     he: "הוספה נכשלה",
   },
+  processing: {
+    en: "Processing…",
+    he: "מעבד…",
+  },
   logout: {
     en: "Logout",
     he: "התנתק",